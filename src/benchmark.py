@@ -0,0 +1,185 @@
+"""Benchmark of the conversion stages with synthetic MIDI workloads.
+
+Times parse, layout, raster and PNG save separately for each converter class and DPI,
+and writes the results into a JSON file, so that results of different commits can be compared.
+Run in the src directory, e.g.
+    python benchmark.py -o bench_new.json --compare bench_old.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+from collections.abc import Callable
+
+import mido
+
+from config import ConfigMng
+from const import CONVERTER_CONFIG_PATHS
+from tracker_bars.base import create_converter
+from tracker_bars.midi_roll import load_midi
+
+PPQ = 480
+
+
+def _write_midi(path: str, events: list[tuple[int, mido.Message]], tempo: int = 500_000) -> None:
+    """Save absolute-tick events as a type-1 MIDI file with a tempo track"""
+    mid = mido.MidiFile(ticks_per_beat=PPQ)
+    mid.tracks.append(mido.MidiTrack([mido.MetaMessage("set_tempo", tempo=tempo, time=0)]))
+    track = mido.MidiTrack()
+    last_tick = 0
+    for tick, msg in sorted(events, key=lambda v: v[0]):
+        track.append(msg.copy(time=tick - last_tick))
+        last_tick = tick
+    mid.tracks.append(track)
+    mid.save(path)
+
+
+def _note(events: list, rng: random.Random, on_tick: int, length: int, note: int) -> None:
+    channel = rng.choice((0, 1, 14))  # Duo-Art organ uses several channels
+    events.append((on_tick, mido.Message("note_on", channel=channel, note=note, velocity=64)))
+    events.append((on_tick + length, mido.Message("note_off", channel=channel, note=note, velocity=0)))
+
+
+def dense_chords(rng: random.Random, scale: float) -> list:
+    """10-note chords on every 8th note"""
+    events: list = []
+    for i in range(int(2000 * scale)):
+        for note in rng.sample(range(21, 109), 10):
+            _note(events, rng, i * PPQ // 2, rng.randint(PPQ // 8, PPQ // 2), note)
+    return events
+
+
+def long_sustain(rng: random.Random, scale: float) -> list:
+    """Very long notes which are drawn as chain perforations"""
+    events: list = []
+    for i in range(int(1500 * scale)):
+        _note(events, rng, i * PPQ, rng.randint(8 * PPQ, 32 * PPQ), rng.randint(21, 108))
+    return events
+
+
+def pedal_flood(rng: random.Random, scale: float) -> list:
+    """Sustain/soft pedal control changes on nearly every beat"""
+    events: list = []
+    for i in range(int(4000 * scale)):
+        tick = i * PPQ // 2
+        control = rng.choice((64, 67))
+        events.append((tick, mido.Message("control_change", control=control, value=127)))
+        events.append((tick + PPQ // 3, mido.Message("control_change", control=control, value=0)))
+        _note(events, rng, tick, PPQ // 3, rng.randint(21, 108))
+    return events
+
+
+def long_duration(rng: random.Random, scale: float) -> list:
+    """Sparse notes over 15 minutes of music"""
+    events: list = []
+    for i in range(int(15 * 60 * 2 * scale)):  # 120 BPM, a note every beat
+        _note(events, rng, i * PPQ, rng.randint(PPQ // 4, PPQ), rng.randint(21, 108))
+    return events
+
+
+WORKLOADS: dict[str, Callable[[random.Random, float], list]] = {
+    "dense_chords": dense_chords,
+    "long_sustain": long_sustain,
+    "pedal_flood": pedal_flood,
+    "long_duration": long_duration,
+}
+
+
+def make_synthetic_midi(path: str, workload: str, scale: float = 1.0, seed: int = 0) -> None:
+    """Generate a deterministic MIDI file of the workload"""
+    rng = random.Random(f"{workload}-{seed}")
+    _write_midi(path, WORKLOADS[workload](rng, scale))
+
+
+def converter_trackers() -> dict[str, str]:
+    """One tracker name for each converter class of create_converter"""
+    trackers: dict[str, str] = {}
+    for name in CONVERTER_CONFIG_PATHS:
+        conf = ConfigMng()
+        conf.load_tracker_config(name)
+        trackers.setdefault(type(create_converter(name, conf)).__name__, name)
+    return trackers
+
+
+def bench_one(midi_path: str, tracker: str, dpi: int, save_path: str) -> dict:
+    conf = ConfigMng()
+    conf.load_tracker_config(tracker)
+    conf.tracker_config["dpi"] = dpi
+
+    roll = load_midi(midi_path)
+    converter = create_converter(tracker, conf)
+    if not converter.render_to_png(roll, save_path):
+        raise RuntimeError(f"Failed to convert {midi_path} with {tracker}")
+
+    stats = converter.stats
+    return {"events": stats.events, "holes": stats.holes, "chain_perforations": stats.chain_perforations, "pixels": stats.canvas_pixels,
+            "parse_sec": stats.load_sec, "layout_sec": stats.pairing_sec + stats.layout_sec, "raster_sec": stats.raster_sec, "save_sec": stats.encode_sec}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(workloads: list[str], dpis: list[int], scale: float, repeat: int) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        save_path = os.path.join(tmpdir, "out.png")
+        for workload in workloads:
+            midi_path = os.path.join(tmpdir, f"{workload}.mid")
+            make_synthetic_midi(midi_path, workload, scale)
+            for class_name, tracker in converter_trackers().items():
+                for dpi in dpis:
+                    # the fastest of the repeats is the least disturbed by other processes
+                    runs = [bench_one(midi_path, tracker, dpi, save_path) for _ in range(repeat)]
+                    res = {"workload": workload, "converter": class_name, "tracker": tracker, "dpi": dpi} | runs[0]
+                    for key in ("parse_sec", "layout_sec", "raster_sec", "save_sec"):
+                        res[key] = min(r[key] for r in runs)
+                    res["total_sec"] = res["parse_sec"] + res["layout_sec"] + res["raster_sec"] + res["save_sec"]
+                    print(f"{workload:14} {class_name:13} {dpi:4}dpi  parse {res['parse_sec']:7.3f}  layout {res['layout_sec']:7.3f}  "
+                          f"raster {res['raster_sec']:7.3f}  save {res['save_sec']:7.3f}  total {res['total_sec']:7.3f} sec")
+                    results.append(res)
+    return results
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Print the time ratio to the baseline results. >1.0 means slower than the baseline."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["workload"], r["converter"], r["dpi"]): r for r in json.load(f)["results"]}
+
+    print(f"\nCompared to {baseline_path}")
+    for res in results:
+        if (base := baseline.get((res["workload"], res["converter"], res["dpi"]))) is None:
+            continue
+        ratios = "  ".join(f"{key.removesuffix('_sec')} {res[key] / max(base[key], 1e-9):5.2f}x"
+                           for key in ("parse_sec", "layout_sec", "raster_sec", "save_sec", "total_sec"))
+        print(f"{res['workload']:14} {res['converter']:13} {res['dpi']:4}dpi  {ratios}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark conversion stages with synthetic MIDI")
+    parser.add_argument("-o", "--output", default="benchmark_result.json", help="JSON file to write the results")
+    parser.add_argument("--workloads", nargs="+", choices=tuple(WORKLOADS.keys()), default=list(WORKLOADS.keys()))
+    parser.add_argument("--dpi", nargs="+", type=int, default=[100, 300])
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplier of the workload size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare", help="previous result JSON to compare with")
+    args = parser.parse_args()
+
+    results = run(args.workloads, args.dpi, args.scale, args.repeat)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                   "scale": args.scale, "repeat": args.repeat, "results": results}, f, indent=4)
+    print(f"Saved results to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Check that the conversion engine imports no GUI modules.
+
+Batch workers and other headless processes import the engine, and tkinter fails on machines without a display.
+Run in the src directory. Exits with 1 if a GUI module is loaded.
+"""
+import sys
+
+GUI_MODULES = ("tkinter", "_tkinter", "customtkinter", "CTkMessagebox", "tkinterdnd2", "PIL.ImageTk")
+
+
+def main() -> int:
+    import cli  # noqa: F401
+    from config import ConfigMng
+    from const import CONVERTER_CONFIG_PATHS
+    from tracker_bars.base import create_converter
+
+    # create_converter imports the converter classes on demand
+    for name in CONVERTER_CONFIG_PATHS:
+        conf = ConfigMng()
+        conf.load_tracker_config(name)
+        create_converter(name, conf)
+
+    if loaded := [name for name in GUI_MODULES if name in sys.modules]:
+        print(f"GUI modules are imported by the conversion engine: {', '.join(loaded)}")
+        return 1
+    print("The conversion engine imports no GUI modules")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
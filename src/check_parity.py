@@ -0,0 +1,101 @@
+"""Check that the fast paths give the same results as the paths they replaced.
+
+- The built-in SMF reader reads the same events as mido.
+- Hole sprites draw the same pixels as ImageDraw.
+Both are checked on the synthetic MIDI of benchmark.py with every tracker config.
+Run in the src directory. Exits with 1 if any result differs.
+"""
+import os
+import sys
+import tempfile
+from dataclasses import fields
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from benchmark import WORKLOADS, make_synthetic_midi
+from config import ConfigMng
+from const import CONVERTER_CONFIG_PATHS
+from tracker_bars.base import (
+    DEFAULT_BAND_HEIGHT,
+    BaseConverter,
+    HoleLayout,
+    create_converter,
+)
+from tracker_bars.midi_roll import MidiRoll, _load_midi_mido, load_midi
+from tracker_bars.smf_reader import read_smf
+
+SCALE = 0.1  # of the benchmark workloads. Enough holes of every kind, and fast to draw with ImageDraw
+DPIS = (100, 300)  # same as benchmark.py
+
+
+def check_smf_reader(midi_path: str) -> list[str]:
+    """Differences of the MidiRoll fields between read_smf and mido"""
+    fast = MidiRoll(*read_smf(midi_path))
+    ref = _load_midi_mido(midi_path)
+    errors = []
+    for field in fields(MidiRoll):
+        if field.name == "load_sec":
+            continue
+        a, b = getattr(fast, field.name), getattr(ref, field.name)
+        if not np.array_equal(a, b):
+            errors.append(f"{field.name} differs from mido")
+    return errors
+
+
+def draw_band_imagedraw(converter: BaseConverter, layout: HoleLayout, img_w: int, band_y: int, band_h: int) -> np.ndarray:
+    """Holes of the band drawn by ImageDraw, as before the hole sprites"""
+    img = Image.new("1", (img_w, band_h))
+    draw = ImageDraw.Draw(img)
+    hole_w = converter.hole_width_px
+    chain_step = max(converter.chain_perforation_spacing_px + hole_w, 1)
+    for hole_x, hole_top, hole_bottom, chain_num in zip(layout.x.tolist(), (layout.top - band_y).tolist(), (layout.bottom - band_y).tolist(), layout.chain_num.tolist()):
+        y = hole_top
+        for _ in range(chain_num):
+            draw.ellipse([hole_x, y, hole_x + hole_w, y + hole_w], fill=1)
+            y += chain_step
+        draw.rounded_rectangle([hole_x, y, hole_x + hole_w, hole_bottom], radius=hole_w // 2, fill=1)
+    return np.asarray(img)
+
+
+def check_hole_sprites(tracker: str, dpi: int, midi_path: str) -> list[str]:
+    """Bands where the stamped holes differ from ImageDraw. Bands cut holes at their edges, so clipping is checked too"""
+    conf = ConfigMng()
+    conf.load_tracker_config(tracker)
+    conf.tracker_config["dpi"] = dpi
+    converter = create_converter(tracker, conf)
+    layout, img_w, img_h = converter.prepare_layout(load_midi(midi_path))
+
+    errors = []
+    for band_y in range(0, img_h, DEFAULT_BAND_HEIGHT):
+        band_h = min(DEFAULT_BAND_HEIGHT, img_h - band_y)
+        in_band = (layout.top < band_y + band_h) & (np.maximum(layout.bottom, layout.top + converter.hole_width_px) >= band_y)
+        band_layout = HoleLayout(*(v[in_band] for v in layout))
+
+        stamped = np.zeros((band_h, img_w), dtype=bool)
+        converter.draw_holes(stamped, band_layout, band_y)
+        if not np.array_equal(stamped, draw_band_imagedraw(converter, band_layout, img_w, band_y, band_h)):
+            errors.append(f"holes differ from ImageDraw in the band at y={band_y}")
+    return errors
+
+
+def main() -> int:
+    failed = False
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for workload in WORKLOADS:
+            midi_path = os.path.join(tmpdir, f"{workload}.mid")
+            make_synthetic_midi(midi_path, workload, SCALE)
+            checks = [("SMF reader", check_smf_reader(midi_path))]
+            checks += [(f"hole sprites {tracker} {dpi}dpi", check_hole_sprites(tracker, dpi, midi_path)) for tracker in CONVERTER_CONFIG_PATHS for dpi in DPIS]
+            for name, errors in checks:
+                print(f"{workload:14} {name:38} {'OK' if not errors else 'FAILED'}")
+                for error in errors[:5]:
+                    print(f"    {error}")
+                failed |= bool(errors)
+
+    print("Some results differ" if failed else "All results are the same")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
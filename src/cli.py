@@ -0,0 +1,423 @@
+"""Command line interface for converting MIDI files without GUI.
+
+Run in the src directory, e.g.
+    python cli.py batch "~/erolls/*.mid" -o output/ --tracker "Ampico B" --tempo 85
+    python cli.py variants song.mid -o output/ --tracker "88-Note" "Welte Licensee" --tempo-sweep
+    python cli.py watch ~/erolls/inbox -o output/ --tracker "Ampico B"
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+
+from config import ConfigMng, _write_atomic
+from const import COMPRESSION_PRESETS, CONVERTER_CONFIG_PATHS, IMAGE_MODES
+from exporters.hole_list import HOLE_LIST_FORMATS
+from tracker_bars.base import create_converter
+from tracker_bars.midi_roll import MidiRoll, load_midi
+from tracker_bars.profile import config_hash
+from tracker_bars.stats import ConvertStats
+
+TEMPO_SWEEP = range(30, 141, 5)  # same as the tempo slider of GUI
+WATCH_MANIFEST_NAME = ".playsk_watch_manifest.json"
+WATCH_MANIFEST_VERSION = 1
+
+
+def collect_midi_files(inputs: list[str]) -> list[str]:
+    """Expand input directories and glob patterns into MIDI file paths"""
+    paths: list[str] = []
+    for pattern in inputs:
+        pattern = os.path.expanduser(pattern)
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        paths += [p for p in glob.glob(pattern) if p.lower().endswith(".mid") and os.path.isfile(p)]
+
+    return sorted(set(paths))
+
+
+def load_conf(tracker: str | None, tempo: int | None, dpi: int | None) -> ConfigMng:
+    """Tracker config with command line overrides. Overrides are not saved."""
+    conf = ConfigMng()
+    if tracker is not None and not conf.load_tracker_config(tracker):
+        raise ValueError(f"Failed to load tracker config: {tracker}")
+    if tempo is not None:
+        conf.tracker_config["tempo"] = tempo
+    if dpi is not None:
+        conf.tracker_config["dpi"] = dpi
+    return conf
+
+
+def image_name(midi_path: str, conf: ConfigMng, image_format: str) -> str:
+    name = os.path.splitext(os.path.basename(midi_path))[0]
+    return f"{name} tempo{conf.tracker_config['tempo']}.{image_format}"
+
+
+def save_roll(roll: MidiRoll, save_path: str, conf: ConfigMng, image_mode: str, image_format: str, compression: str) -> tuple[bool, ConvertStats]:
+    converter = create_converter(conf.tracker_name, conf)
+    if image_format == "tif":
+        ok = converter.render_to_tiff(roll, save_path, mode=image_mode, compression=compression)
+    elif image_format in ("svg", "pdf"):
+        ok = converter.render_to_vector(roll, save_path, mode=image_mode)
+    elif image_format in HOLE_LIST_FORMATS:
+        ok = converter.save_hole_list(roll, save_path, conf.tracker_name)
+    else:
+        ok = converter.render_to_png(roll, save_path, mode=image_mode, compression=compression)
+    return ok, converter.stats
+
+
+def convert_file(midi_path: str, output_dir: str, conf: ConfigMng, image_mode: str = "gray", image_format: str = "png", compression: str = "balanced") -> dict:
+    """Convert one file. Runs in a worker process."""
+    t1 = time.perf_counter()
+    save_path = os.path.join(output_dir, image_name(midi_path, conf, image_format))
+    stats = ConvertStats()
+    try:
+        ok, stats = save_roll(load_midi(midi_path), save_path, conf, image_mode, image_format, compression)
+    except Exception as e:
+        print(e)
+        ok = False
+
+    return {"midi_path": midi_path, "save_path": save_path, "label": os.path.basename(midi_path), "ok": ok,
+            "sec": time.perf_counter() - t1, "pixels": stats.canvas_pixels, "stats": stats.to_dict()}
+
+
+_shared_roll: MidiRoll | None = None  # parsed MIDI shared by all variants, set in each worker process
+
+
+def _set_shared_roll(roll: MidiRoll) -> None:
+    global _shared_roll
+    _shared_roll = roll
+
+
+def convert_variant(midi_path: str, save_path: str, conf: ConfigMng, image_mode: str, image_format: str, compression: str) -> dict:
+    """Render one variant of the shared MIDI. Runs in a worker process."""
+    t1 = time.perf_counter()
+    stats = ConvertStats()
+    try:
+        if _shared_roll is None:
+            raise RuntimeError("MIDI is not shared with the worker")
+        ok, stats = save_roll(_shared_roll, save_path, conf, image_mode, image_format, compression)
+    except Exception as e:
+        print(e)
+        ok = False
+
+    return {"midi_path": midi_path, "save_path": save_path, "label": save_path, "ok": ok,
+            "sec": time.perf_counter() - t1, "pixels": stats.canvas_pixels, "stats": stats.to_dict()}
+
+
+def failed_result(midi_path: str, save_path: str, label: str, sec: float) -> dict:
+    """Result of a conversion that did not return, e.g. when its worker process died"""
+    return {"midi_path": midi_path, "save_path": save_path, "label": label, "ok": False,
+            "sec": sec, "pixels": 0, "stats": ConvertStats().to_dict()}
+
+
+def print_summary(results: list[dict], wall_sec: float) -> None:
+    print(f"{'sec':>8} {'Mpx':>9} {'Mpx/s':>8}  file")
+    for res in results:
+        mpx = res["pixels"] / 1e6
+        status = "" if res["ok"] else "  FAILED"
+        print(f"{res['sec']:8.2f} {mpx:9.1f} {mpx / res['sec']:8.1f}  {res['label']}{status}")
+
+    ok_num = sum(res["ok"] for res in results)
+    total_mpx = sum(res["pixels"] for res in results if res["ok"]) / 1e6
+    cpu_sec = sum(res["sec"] for res in results)
+    print(f"{ok_num}/{len(results)} files converted in {wall_sec:.2f} sec. "
+          f"{ok_num / wall_sec:.2f} files/s, {total_mpx / wall_sec:.1f} Mpx/s, "
+          f"parallel speedup {cpu_sec / wall_sec:.1f}x")
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    conf = load_conf(args.tracker, args.tempo, args.dpi)
+    paths = collect_midi_files(args.inputs)
+    if not paths:
+        print("No MIDI files found")
+        return 1
+
+    # the largest files first, so a long roll does not start last and keep the others waiting
+    paths.sort(key=os.path.getsize, reverse=True)
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f"Converting {len(paths)} files with {conf.tracker_name}, tempo {conf.tracker_config['tempo']}, {conf.tracker_config['dpi']} DPI, {args.image_mode} {args.format.upper()}, {args.compression} compression")
+
+    t1 = time.perf_counter()
+    results: list[dict] = []
+    stats_path = args.stats_file or os.path.join(args.output_dir, "conversion_stats.jsonl")
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor, open(stats_path, "a", encoding="utf-8") as stats_file:
+        futures = {executor.submit(convert_file, path, args.output_dir, conf, args.image_mode, args.format, args.compression): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                res = future.result()
+            except Exception as e:  # BrokenProcessPool when a worker dies. the other files are still recorded
+                print(e)
+                path = futures[future]
+                res = failed_result(path, os.path.join(args.output_dir, image_name(path, conf, args.format)), os.path.basename(path), time.perf_counter() - t1)
+            print(f"{'Saved' if res['ok'] else 'Failed'}: {res['save_path']} ({res['sec']:.2f} sec)")
+            write_stats(stats_file, res)
+            results.append(res)
+
+    print_summary(results, time.perf_counter() - t1)
+    return 0 if all(res["ok"] for res in results) else 1
+
+
+def write_stats(stats_file, res: dict) -> None:
+    stats_file.write(json.dumps({"midi_path": res["midi_path"], "save_path": res["save_path"], "ok": res["ok"]} | res["stats"]) + "\n")
+
+
+def run_variants(args: argparse.Namespace) -> int:
+    t1 = time.perf_counter()
+    try:
+        roll = load_midi(args.input)
+    except Exception as e:
+        print(e)
+        return 1
+    print(f"Parsed {args.input} in {roll.load_sec:.2f} sec")
+    roll.load_sec = 0.0  # parsed once, not by each variant
+
+    trackers = args.tracker or [ConfigMng().tracker_name]
+    tempos: list[int | None] = list(TEMPO_SWEEP) if args.tempo_sweep else (args.tempo or [None])
+    dpis: list[int | None] = args.dpi or [None]
+    tasks: list[tuple[str, ConfigMng]] = []
+    for tracker in trackers:
+        for dpi in dpis:
+            for tempo in tempos:
+                conf = load_conf(tracker, tempo, dpi)
+                output_dir = args.output_dir
+                if len(trackers) > 1:
+                    output_dir = os.path.join(output_dir, tracker)
+                if len(dpis) > 1:
+                    output_dir = os.path.join(output_dir, f"{conf.tracker_config['dpi']}dpi")
+                os.makedirs(output_dir, exist_ok=True)
+                tasks.append((os.path.join(output_dir, image_name(args.input, conf, args.format)), conf))
+
+    # the longest images first. the image length is proportional to tempo and DPI
+    tasks.sort(key=lambda task: task[1].tracker_config["tempo"] * task[1].tracker_config["dpi"], reverse=True)
+    print(f"Rendering {len(tasks)} variants")
+
+    results: list[dict] = []
+    stats_path = args.stats_file or os.path.join(args.output_dir, "conversion_stats.jsonl")
+    # the parsed MIDI is sent to each worker process once, not with every variant
+    with (ProcessPoolExecutor(max_workers=args.jobs, initializer=_set_shared_roll, initargs=(roll,)) as executor,
+          open(stats_path, "a", encoding="utf-8") as stats_file):
+        futures = {executor.submit(convert_variant, args.input, save_path, conf, args.image_mode, args.format, args.compression): save_path for save_path, conf in tasks}
+        for future in as_completed(futures):
+            try:
+                res = future.result()
+            except Exception as e:  # BrokenProcessPool when a worker dies. the other variants are still recorded
+                print(e)
+                res = failed_result(args.input, futures[future], futures[future], time.perf_counter() - t1)
+            res["label"] = os.path.relpath(res["save_path"], args.output_dir)
+            print(f"{'Saved' if res['ok'] else 'Failed'}: {res['save_path']} ({res['sec']:.2f} sec)")
+            write_stats(stats_file, res)
+            results.append(res)
+
+    print_summary(results, time.perf_counter() - t1)
+    return 0 if all(res["ok"] for res in results) else 1
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def load_manifest(path: str) -> dict[str, dict]:
+    """Converted files of the previous runs, keyed by the MIDI file name. Empty if missing or broken"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == WATCH_MANIFEST_VERSION:
+            return manifest["files"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Ignored the broken manifest {path}: {e}")
+    return {}
+
+
+def save_manifest(path: str, files: dict[str, dict]) -> None:
+    # replaced at once, so a stop while writing does not lose the manifest
+    _write_atomic(path, json.dumps({"version": WATCH_MANIFEST_VERSION, "files": files}, indent=1))
+
+
+class FolderWatcher:
+    """Find MIDI files in a directory which are written completely and not converted with the current settings yet.
+
+    A file is ready when its size and mtime have not changed for settle_sec, so a burst of writes to one file makes one job.
+    Files whose size and mtime match the manifest are skipped without reading. Others are skipped if the content hash
+    and the config hash match, e.g. a file touched or copied again.
+    """
+    def __init__(self, input_dir: str, manifest: dict[str, dict], conf_hash: str, settle_sec: float) -> None:
+        self.input_dir = input_dir
+        self.manifest = manifest
+        self.conf_hash = conf_hash
+        self.settle_sec = settle_sec
+        self.seen: dict[str, tuple[int, int, float]] = {}  # name -> size, mtime_ns, time first seen with them
+        self.settling = 0  # number of files which were still changing at the last poll
+
+    def poll(self, busy: set[str]) -> list[tuple[str, dict]]:
+        """New jobs as (name, manifest entry without the result). Files in busy are being converted and left for a later poll"""
+        now = time.monotonic()
+        current: dict[str, tuple[int, int]] = {}
+        try:
+            with os.scandir(self.input_dir) as it:
+                for dir_entry in it:
+                    if not dir_entry.name.lower().endswith(".mid"):
+                        continue
+                    try:
+                        if dir_entry.is_file():
+                            st = dir_entry.stat()
+                            current[dir_entry.name] = (st.st_size, st.st_mtime_ns)
+                    except OSError:  # removed or moved since the listing
+                        continue
+        except OSError as e:
+            # e.g. a network share dropped for a moment. The files seen so far are kept, and the next poll tries again
+            print(e)
+            return []
+
+        jobs: list[tuple[str, dict]] = []
+        self.settling = 0
+        for name, (size, mtime_ns) in current.items():
+            prev = self.seen.get(name)
+            if prev is None or prev[:2] != (size, mtime_ns):
+                self.seen[name] = (size, mtime_ns, now)
+                self.settling += 1
+                continue
+            if now - prev[2] < self.settle_sec:
+                self.settling += 1
+                continue
+            if name in busy:
+                continue
+
+            done = self.manifest.get(name)
+            if done is not None and done["config_hash"] == self.conf_hash and (done["size"], done["mtime_ns"]) == (size, mtime_ns):
+                continue
+            try:
+                content_hash = file_hash(os.path.join(self.input_dir, name))
+            except OSError as e:
+                print(e)
+                continue
+            entry = {"content_hash": content_hash, "config_hash": self.conf_hash, "size": size, "mtime_ns": mtime_ns}
+            if done is not None and (done["content_hash"], done["config_hash"]) == (content_hash, self.conf_hash):
+                done.update(entry)  # same content. only the file stat changed
+                continue
+            jobs.append((name, entry))
+
+        for name in self.seen.keys() - current.keys():
+            del self.seen[name]
+        return jobs
+
+
+def run_watch(args: argparse.Namespace) -> int:
+    conf = load_conf(args.tracker, args.tempo, args.dpi)
+    if not os.path.isdir(args.input_dir):
+        print(f"Not a directory: {args.input_dir}")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # the output depends on the tracker config and the output options, so a change of them converts all files again
+    conf_hash = config_hash({"tracker": conf.tracker_name, "tracker_config": conf.tracker_config,
+                             "image_mode": args.image_mode, "format": args.format, "compression": args.compression})
+    manifest_path = args.manifest or os.path.join(args.output_dir, WATCH_MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    watcher = FolderWatcher(args.input_dir, manifest, conf_hash, args.settle)
+    stats_path = args.stats_file or os.path.join(args.output_dir, "conversion_stats.jsonl")
+    print(f"Watching {args.input_dir} with {conf.tracker_name}, tempo {conf.tracker_config['tempo']}, {conf.tracker_config['dpi']} DPI, "
+          f"{args.image_mode} {args.format.upper()}. Press Ctrl+C to stop")
+
+    running: dict[Future, tuple[str, dict]] = {}
+    failed = False
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor, open(stats_path, "a", encoding="utf-8") as stats_file:
+
+        def record_finished() -> None:
+            nonlocal failed
+            finished = [future for future in running if future.done()]
+            for future in finished:
+                name, entry = running.pop(future)
+                if future.cancelled() or future.exception() is not None:  # stopped before or while converting
+                    continue
+                res = future.result()
+                print(f"{'Saved' if res['ok'] else 'Failed'}: {res['save_path']} ({res['sec']:.2f} sec)")
+                write_stats(stats_file, res)
+                stats_file.flush()
+                failed |= not res["ok"]
+                # a failed file is recorded too, and tried again only when it changes
+                manifest[name] = entry | {"save_path": res["save_path"], "ok": res["ok"]}
+            if finished:
+                save_manifest(manifest_path, manifest)
+
+        try:
+            while True:
+                jobs = watcher.poll({name for name, _ in running.values()})
+                for name, entry in jobs:
+                    future = executor.submit(convert_file, os.path.join(args.input_dir, name), args.output_dir, conf,
+                                             args.image_mode, args.format, args.compression)
+                    running[future] = (name, entry)
+                record_finished()
+
+                if args.once and not jobs and not running and watcher.settling == 0:
+                    break
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            print("Stopping. Waiting for the running conversions")
+            executor.shutdown(wait=True, cancel_futures=True)
+            record_finished()
+
+    return 1 if failed else 0
+
+
+def add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--image-mode", choices=IMAGE_MODES, default="gray",
+                        help="gray: 8-bit grayscale, indexed: 1-bit with roll color palette, mono: 1-bit black and white. default is gray")
+    parser.add_argument("--format", choices=("png", "tif", "svg", "pdf", *HOLE_LIST_FORMATS), default="png",
+                        help="image file format. tif is tiled with reduced resolution levels for viewing long rolls. svg and pdf are vector images of the hole shapes. "
+                             "holes (binary), json and csv are lists of the holes instead of an image. default is png")
+    parser.add_argument("--compression", choices=tuple(COMPRESSION_PRESETS.keys()), default="balanced",
+                        help="PNG and TIFF compression. fastest for scratch renders, smallest for archives. default is balanced")
+    parser.add_argument("--stats-file", help="JSON lines file to append per-file conversion stats. default is conversion_stats.jsonl in the output directory")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="number of worker processes. default is the number of cores")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="PlaySK MIDI to piano roll image converter")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser("batch", help="convert many MIDI files in parallel")
+    batch.add_argument("inputs", nargs="+", help="input directories or glob patterns of MIDI files")
+    batch.add_argument("-o", "--output-dir", required=True, help="directory to save images")
+    batch.add_argument("--tracker", choices=tuple(CONVERTER_CONFIG_PATHS.keys()), help="tracker bar. default is the last one used in GUI")
+    batch.add_argument("--tempo", type=int, help="override roll tempo")
+    batch.add_argument("--dpi", type=int, help="override output DPI")
+    add_output_arguments(batch)
+    batch.set_defaults(func=run_batch)
+
+    variants = subparsers.add_parser("variants", help="render one MIDI file with several trackers, tempos and DPIs, parsing it only once")
+    variants.add_argument("input", help="MIDI file")
+    variants.add_argument("-o", "--output-dir", required=True, help="directory to save images. a sub directory is made for each tracker and DPI when several are given")
+    variants.add_argument("--tracker", nargs="+", choices=tuple(CONVERTER_CONFIG_PATHS.keys()), help="tracker bars. default is the last one used in GUI")
+    tempo = variants.add_mutually_exclusive_group()
+    tempo.add_argument("--tempo", nargs="+", type=int, help="roll tempos. default is the tempo of each tracker config")
+    tempo.add_argument("--tempo-sweep", action="store_true", help=f"all tempos of the GUI slider, {TEMPO_SWEEP.start} to {TEMPO_SWEEP.stop - 1} in steps of {TEMPO_SWEEP.step}")
+    variants.add_argument("--dpi", nargs="+", type=int, help="output DPIs. default is the DPI of each tracker config")
+    add_output_arguments(variants)
+    variants.set_defaults(func=run_variants)
+
+    watch = subparsers.add_parser("watch", help="convert new or modified MIDI files in a directory as they are saved, until stopped")
+    watch.add_argument("input_dir", help="directory to watch. sub directories are not watched")
+    watch.add_argument("-o", "--output-dir", required=True, help="directory to save images")
+    watch.add_argument("--tracker", choices=tuple(CONVERTER_CONFIG_PATHS.keys()), help="tracker bar. default is the last one used in GUI")
+    watch.add_argument("--tempo", type=int, help="override roll tempo")
+    watch.add_argument("--dpi", type=int, help="override output DPI")
+    watch.add_argument("--interval", type=float, default=1.0, help="seconds between scans of the directory. default is 1")
+    watch.add_argument("--settle", type=float, default=2.0, help="seconds a file must stay unchanged before it is converted. default is 2")
+    watch.add_argument("--manifest", help=f"JSON file of the converted files, kept across restarts. default is {WATCH_MANIFEST_NAME} in the output directory")
+    watch.add_argument("--once", action="store_true", help="convert the files waiting in the directory and exit")
+    add_output_arguments(watch)
+    watch.set_defaults(func=run_watch)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
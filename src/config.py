@@ -1,42 +1,155 @@
+import copy
 import json
+import os
+import tempfile
+import threading
 
 from const import BASE_CONFIG_PATH, CONVERTER_CONFIG_PATHS
 
+SAVE_DELAY_SEC = 1.0  # save_config_later() waits for more changes within this time
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """Write into a temp file in the same directory, then rename it over the path.
+    Readers, e.g. other batch workers, see either the old or the new file, never a partial one.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        # mkstemp creates the file only readable by the owner
+        os.chmod(tmp_path, os.stat(path).st_mode if os.path.exists(path) else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
 
 class ConfigMng:
     def __init__(self) -> None:
         self.tracker_name = ""
         self.tracker_config: dict = {}
+        # contents of the files as last read or written. Used to find changed keys
+        self.saved_base_config: dict = {}
+        self.saved_tracker_config: dict = {}
+        self.save_lock = threading.Lock()
+        self.save_timer: threading.Timer | None = None
 
         try:
             with open(BASE_CONFIG_PATH, encoding="utf-8") as f:
                 self.base_config = json.load(f)
+            self.saved_base_config = copy.deepcopy(self.base_config)
             self.load_tracker_config(self.base_config["tracker"])
         except FileNotFoundError:
             self.base_config = {}
 
+    def __getstate__(self) -> dict:
+        # the lock and the timer can't be sent to batch worker processes
+        state = self.__dict__.copy()
+        del state["save_lock"]
+        state["save_timer"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.save_lock = threading.Lock()
+
     def load_tracker_config(self, tracker_name: str) -> bool:
-        self.tracker_name = ""
-        try:
-            path = CONVERTER_CONFIG_PATHS.get(tracker_name, "")
-            with open(path, encoding="utf-8") as f:
-                self.tracker_config = json.load(f)
+        # the timer thread may be saving. The tracker is swapped under the lock, so a save writes either the old or the new one
+        with self.save_lock:
+            # changes of the current tracker waiting for save_config_later() would be lost
+            if self.save_timer is not None:
+                self._save_now()
+
+            try:
+                path = CONVERTER_CONFIG_PATHS.get(tracker_name, "")
+                with open(path, encoding="utf-8") as f:
+                    tracker_config = json.load(f)
+            except FileNotFoundError:
+                self.tracker_name = ""
+                self.tracker_config = {}
+                self.saved_tracker_config = {}
+                return False
+
             self.tracker_name = tracker_name
-        except FileNotFoundError:
-            self.tracker_config = {}
-            return False
+            self.tracker_config = tracker_config
+            self.saved_tracker_config = copy.deepcopy(tracker_config)
         return True
 
+    def dirty_keys(self) -> set[str]:
+        """Keys changed since the last load or save. Keys of tracker config are prefixed with "tracker_config." """
+        keys = {key for key in self.base_config.keys() | self.saved_base_config.keys()
+                if self.base_config.get(key) != self.saved_base_config.get(key)}
+        keys |= {f"tracker_config.{key}" for key in self.tracker_config.keys() | self.saved_tracker_config.keys()
+                 if self.tracker_config.get(key) != self.saved_tracker_config.get(key)}
+        return keys
+
     def save_config(self) -> None:
+        """Write the changed config files now. Unchanged files are not written."""
+        with self.save_lock:
+            self._save_now()
+
+    def save_config_later(self, delay: float = SAVE_DELAY_SEC) -> None:
+        """Save after delay seconds on a timer thread. Calls within the delay are merged into one save.
+        The changed files are serialized now on the calling thread, which owns the configs, and only the text is written by the timer.
+        """
+        with self.save_lock:
+            self._cancel_timer()
+            snapshot = self._snapshot()
+            if snapshot is None:
+                return
+            self.save_timer = threading.Timer(delay, self._write_later, snapshot)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def _cancel_timer(self) -> None:
+        # called with save_lock held
+        if self.save_timer is not None:
+            self.save_timer.cancel()
+            self.save_timer = None
+
+    def _snapshot(self) -> tuple[str | None, str, str | None] | None:
+        """JSON text of the changed base config, the tracker name and JSON text of the changed tracker config.
+        None if the configs can't be serialized. Called with save_lock held
+        """
+        dirty = self.dirty_keys()
         try:
-            with open(BASE_CONFIG_PATH, "w", encoding="utf-8") as f:
-                json.dump(self.base_config, f, ensure_ascii=False, indent=4)
+            base_text = json.dumps(self.base_config, ensure_ascii=False, indent=4) if any(not key.startswith("tracker_config.") for key in dirty) else None
+            tracker_text = None
+            if self.tracker_name and any(key.startswith("tracker_config.") for key in dirty):
+                tracker_text = json.dumps(self.tracker_config, ensure_ascii=False, indent=4)
+        except (TypeError, ValueError) as e:
+            print(f"Failed to save config: {e}")
+            return None
+        return base_text, self.tracker_name, tracker_text
+
+    def _save_now(self) -> None:
+        # called with save_lock held
+        self._cancel_timer()
+        if (snapshot := self._snapshot()) is not None:
+            self._write(*snapshot)
+
+    def _write_later(self, base_text: str | None, tracker_name: str, tracker_text: str | None) -> None:
+        # runs on the timer thread
+        with self.save_lock:
+            if self.save_timer is not threading.current_thread():  # superseded, or already saved by save_config()
+                return
+            self.save_timer = None
+            self._write(base_text, tracker_name, tracker_text)
+
+    def _write(self, base_text: str | None, tracker_name: str, tracker_text: str | None) -> None:
+        # called with save_lock held
+        try:
+            if base_text is not None:
+                _write_atomic(BASE_CONFIG_PATH, base_text)
+                self.saved_base_config = json.loads(base_text)
+            if tracker_text is not None:
+                _write_atomic(CONVERTER_CONFIG_PATHS[tracker_name], tracker_text)
+                if tracker_name == self.tracker_name:
+                    self.saved_tracker_config = json.loads(tracker_text)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Failed to save config: {e}")
 
-            path = CONVERTER_CONFIG_PATHS.get(self.tracker_name, "")
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(self.tracker_config, f, ensure_ascii=False, indent=4)
-        except FileNotFoundError:
-            pass
 
 if __name__ == "__main__":
     obj = ConfigMng()
@@ -1,4 +1,5 @@
 import os
+import zlib
 
 APP_TITLE = "PlaySK Midi to Piano Roll Image Converter"
 APP_VERSION = "1.2.0"
@@ -6,6 +7,8 @@ COPY_RIGHT = "(C)Sasaki Katsumasa 2025"
 LINK_COLOR = "#0066c0"
 APP_WIDTH = 1200
 APP_HEIGHT = 900
+ROLL_VIEW_WIDTH = 900
+ROLL_VIEW_HEIGHT = 900
 ASSETS_DIR = "playsk_midi_to_roll_image_converter_assets"
 BASE_CONFIG_PATH = os.path.join(ASSETS_DIR, "config.json")
 CONVERTER_CONFIG_PATHS = {
@@ -15,3 +18,10 @@ CONVERTER_CONFIG_PATHS = {
     "Aeolian 176-note": os.path.join(ASSETS_DIR, "Aeolian 176-note config.json"),
     "Welte Licensee": os.path.join(ASSETS_DIR, "Welte Licensee config.json"),
 }
+IMAGE_MODES = ("gray", "indexed", "mono")  # 8-bit grayscale, 1-bit palette of roll color and white, 1-bit black and white
+# zlib level and strategy of PNG. run-length encoding is nearly as small as the default level 6 on roll images, and faster than level 1
+COMPRESSION_PRESETS = {
+    "fastest": (1, zlib.Z_RLE),
+    "balanced": (6, zlib.Z_DEFAULT_STRATEGY),
+    "smallest": (9, zlib.Z_DEFAULT_STRATEGY),
+}
@@ -0,0 +1,82 @@
+import customtkinter as ctk
+
+from config import ConfigMng
+from custom_widgets import CustomScrollableFrame, MyCTkFloatInput, MyCTkIntInput
+
+
+class DuoArtOrganSetting(CustomScrollableFrame):
+    def __init__(self, parent: ctk.CTk, conf: ConfigMng) -> None:
+        super().__init__(parent)
+        self.detailed_settings = conf.tracker_config.get("detailed_settings", {})
+        # entry widgets are kept here, not in the config, which must stay JSON serializable for the debounced save
+        self.midi_ch_edits: dict[str, ctk.CTkComboBox] = {}
+        self.note_no_edits: dict[str, dict[str, MyCTkIntInput]] = {}
+
+        self.pack(fill="both", expand=True)
+
+        # vertical offset
+        ctk.CTkLabel(self, text="Upper/Lower holes Vertical Offset (inch)").pack(side="top")
+        tmp = MyCTkFloatInput(self, width=50)
+        tmp.insert(0, self.detailed_settings["vertical_offset"])
+        tmp.pack(side="top")
+        left_frame = ctk.CTkFrame(self)
+        left_frame.pack(side="left", anchor="nw")
+        right_frame = ctk.CTkFrame(self)
+        right_frame.pack(side="right", anchor="ne")
+        self.vertical_offset_edit = tmp
+
+        row_no = 0
+        frame = left_frame
+        for key in ("Upper playing 58 notes (Swell)", "Upper control holes (Swell)",
+                    "Lower playing 58 notes (Great)", "Lower control holes (Great)"):
+            val = self.detailed_settings[key]
+            if key == "Lower playing 58 notes (Great)":
+                row_no = 0
+                frame = right_frame
+
+            # label
+            font = ctk.CTkFont(size=20)
+            section = ctk.CTkLabel(frame, text=key, font=font)
+            section.grid(row=row_no, column=0, columnspan=3, padx=5, pady=(30, 10))
+            row_no += 1
+
+            # MIDI Channel
+            ctk.CTkLabel(frame, text="Midi Channel").grid(row=row_no, column=0, padx=5, pady=5)
+            tmp = ctk.CTkComboBox(frame, values=[str(i) for i in range(1, 16 + 1)], width=80)
+            tmp.set(val["Midi Channel"])
+            tmp.grid(row=row_no, column=1, padx=5, pady=5)
+            row_no += 1
+            self.midi_ch_edits[key] = tmp
+            self.note_no_edits[key] = {}
+
+            # header
+            headers = ["Hole No", "Name", "MIDI Note No"]
+            for i, text in enumerate(headers):
+                label = ctk.CTkLabel(frame, text=text)
+                label.grid(row=row_no, column=i, padx=5, pady=5)
+            row_no += 1
+
+            for hole_name, val2 in val["Holes"].items():
+                # Hole No.
+                hole_label = ctk.CTkLabel(frame, text=str(val2["hole_no"]))
+                hole_label.grid(row=row_no, column=0, padx=5, pady=2)
+
+                # Name
+                name_entry = ctk.CTkLabel(frame, text=hole_name)
+                name_entry.grid(row=row_no, column=1, padx=5, pady=2)
+
+                # Note Number
+                tmp = MyCTkIntInput(frame, width=50)
+                tmp.insert(0, val2["midi_note_no"])
+                tmp.grid(row=row_no, column=2, padx=5, pady=2)
+                self.note_no_edits[key][hole_name] = tmp
+                row_no += 1
+
+    def destroy(self):
+        self.detailed_settings["vertical_offset"] = float(self.vertical_offset_edit.get())
+
+        for key, midi_ch_edit in self.midi_ch_edits.items():
+            self.detailed_settings[key]["Midi Channel"] = int(midi_ch_edit.get())
+            for hole_name, note_no_edit in self.note_no_edits[key].items():
+                self.detailed_settings[key]["Holes"][hole_name]["midi_note_no"] = int(note_no_edit.get())
+        super().destroy()
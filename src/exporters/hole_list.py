@@ -0,0 +1,64 @@
+"""Hole list of a roll, for players which would otherwise detect the holes from the image.
+
+Binary format (.holes), little endian:
+    magic b"PSKH", format version (uint16), header length (uint32), header (UTF-8 JSON), hole records (HOLE_DTYPE)
+The header has the tracker, DPI, tempo, acceleration rate and the number of holes.
+Records are sorted by the start position. Positions are in inches from the roll start, i.e. the bottom of the image.
+JSON and CSV have the same contents for debugging. CSV has the header as "# key: value" lines.
+"""
+import csv
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"PSKH"
+FORMAT_VERSION = 1
+HOLE_DTYPE = np.dtype([
+    ("hole_no", "<i2"),  # tracker hole index, 0 at the leftmost hole
+    ("chain_num", "<u2"),  # number of chain perforation dots. 0 for a normal hole
+    ("start", "<f4"),  # inch. start of the hole, including chain perforations
+    ("end", "<f4"),  # inch
+])
+HOLE_FIELDS: tuple[str, ...] = tuple(HOLE_DTYPE.fields or ())
+HOLE_LIST_FORMATS = ("holes", "json", "csv")
+
+
+def _rows(holes: np.ndarray) -> list[tuple]:
+    # float32 positions printed to the 1/10000 inch, without the float32 noise digits
+    return [(hole_no, chain_num, round(start, 4), round(end, 4)) for hole_no, chain_num, start, end in holes.tolist()]
+
+
+def write_hole_list(path: str, header: dict, holes: np.ndarray) -> None:
+    """Write header and HOLE_DTYPE records by the file extension"""
+    header = header | {"format_version": FORMAT_VERSION, "hole_count": len(holes)}
+    ext = path.rsplit(".", 1)[-1].lower()
+    if ext == "holes":
+        header_bytes = json.dumps(header).encode()
+        with open(path, "wb") as f:
+            f.write(MAGIC + struct.pack("<HI", FORMAT_VERSION, len(header_bytes)) + header_bytes)
+            f.write(holes.astype(HOLE_DTYPE, copy=False).tobytes())
+    elif ext == "json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(header | {"holes": [dict(zip(HOLE_FIELDS, row)) for row in _rows(holes)]}, f, indent=1)
+    elif ext == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.writelines(f"# {key}: {value}\n" for key, value in header.items())
+            writer = csv.writer(f)
+            writer.writerow(HOLE_FIELDS)
+            writer.writerows(_rows(holes))
+    else:
+        raise ValueError(f"Unsupported hole list format: {path}")
+
+
+def read_hole_list(path: str) -> tuple[dict, np.ndarray]:
+    """Read the binary hole list. Returns the header and HOLE_DTYPE records"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"Not a hole list file: {path}")
+    version, header_len = struct.unpack_from("<HI", data, 4)
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported hole list version: {version}")
+    header = json.loads(data[10:10 + header_len])
+    return header, np.frombuffer(data, dtype=HOLE_DTYPE, offset=10 + header_len)
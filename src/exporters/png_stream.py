@@ -0,0 +1,77 @@
+import struct
+import zlib
+from types import TracebackType
+
+import numpy as np
+
+
+class PngStreamWriter:
+    """Write a grayscale or indexed color PNG incrementally, a band of rows at a time.
+
+    Only the current band and the previous row are kept in memory, so the image height is unlimited.
+    Rows are filtered with the PNG "Up" filter, which suits the long vertical holes of a roll.
+    Rows are given in PNG sample format, e.g. packed bits (np.packbits) for bit_depth=1.
+    With palette, the image is indexed color. Otherwise grayscale.
+    """
+    def __init__(self, path: str, width: int, height: int, dpi: int | None = None, compress_level: int = 6,
+                 compress_strategy: int = zlib.Z_DEFAULT_STRATEGY, bit_depth: int = 8, palette: list[tuple[int, int, int]] | None = None) -> None:
+        self.width = width
+        self.height = height
+        self.row_bytes = (width * bit_depth + 7) // 8
+        self.rows_written = 0
+        self.prev_row = np.zeros(self.row_bytes, dtype=np.uint8)
+        self.compressor = zlib.compressobj(compress_level, zlib.DEFLATED, zlib.MAX_WBITS, 8, compress_strategy)
+        self.f = open(path, "wb")  # noqa: SIM115
+
+        self.f.write(b"\x89PNG\r\n\x1a\n")
+        color_type = 0 if palette is None else 3
+        self._write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0))
+        if palette is not None:
+            self._write_chunk(b"PLTE", bytes(v for color in palette for v in color))
+        if dpi is not None:
+            ppm = round(dpi / 0.0254)  # pixels per meter
+            self._write_chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes) -> None:
+        self.f.write(struct.pack(">I", len(data)))
+        self.f.write(chunk_type)
+        self.f.write(data)
+        self.f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        """Append rows. rows is an uint8 array of shape (row_num, bytes per row)"""
+        if rows.shape[0] == 0:
+            return
+        if rows.shape[1] != self.row_bytes or self.rows_written + rows.shape[0] > self.height:
+            raise ValueError("Rows do not fit the image size")
+
+        # Up filter: difference to the previous row, with filter type byte at the head of each row
+        filtered = np.empty((rows.shape[0], self.row_bytes + 1), dtype=np.uint8)
+        filtered[:, 0] = 2
+        filtered[0, 1:] = rows[0] - self.prev_row
+        filtered[1:, 1:] = rows[1:] - rows[:-1]
+        self.prev_row = rows[-1].copy()
+        self.rows_written += rows.shape[0]
+
+        if data := self.compressor.compress(filtered.tobytes()):
+            self._write_chunk(b"IDAT", data)
+
+    def close(self) -> None:
+        if self.f.closed:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"Only {self.rows_written} of {self.height} rows were written")
+            self._write_chunk(b"IDAT", self.compressor.flush())
+            self._write_chunk(b"IEND", b"")
+        finally:
+            self.f.close()
+
+    def __enter__(self) -> "PngStreamWriter":
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.f.close()
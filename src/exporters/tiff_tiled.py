@@ -0,0 +1,224 @@
+import struct
+import zlib
+from types import TracebackType
+
+import numpy as np
+
+DEFAULT_TILE_SIZE = 512  # px. multiple of 16, as TIFF requires
+BIGTIFF_THRESHOLD = 2 ** 32 - 2 ** 26  # uncompressed bytes. deflate may not shrink the data, so switch below 4 GiB with some margin
+
+# TIFF field types
+SHORT = 3
+LONG = 4
+RATIONAL = 5
+LONG8 = 16
+_TYPE_FORMATS = {SHORT: "H", LONG: "I", RATIONAL: "II", LONG8: "Q"}
+
+
+class _Level:
+    """Tiles of one pyramid level. Rows are buffered until a row of tiles is complete."""
+    def __init__(self, width: int, height: int, bit_depth: int, tile_size: int) -> None:
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.tile_size = tile_size
+        self.tiles_x = (width + tile_size - 1) // tile_size
+        self.tile_row_bytes = tile_size * bit_depth // 8
+        self.buf = np.zeros((0, self.tiles_x * self.tile_row_bytes), dtype=np.uint8)
+        self.rows_written = 0
+        self.tile_offsets: list[int] = []
+        self.tile_byte_counts: list[int] = []
+        self.pending: np.ndarray | None = None  # a gray row waiting for its pair to make the next level
+
+    def raw_size(self) -> int:
+        tiles_y = (self.height + self.tile_size - 1) // self.tile_size
+        return self.tiles_x * tiles_y * self.tile_row_bytes * self.tile_size
+
+
+def _reduce(gray: np.ndarray) -> np.ndarray:
+    """Half size by averaging 2x2 pixels. gray has even rows. The last column is repeated for odd width"""
+    if gray.shape[1] % 2:
+        gray = np.concatenate([gray, gray[:, -1:]], axis=1)
+    v = gray.astype(np.uint16)
+    return ((v[0::2, 0::2] + v[0::2, 1::2] + v[1::2, 0::2] + v[1::2, 1::2] + 2) // 4).astype(np.uint8)
+
+
+class TiledTiffWriter:
+    """Write a tiled TIFF with reduced resolution levels incrementally, a band of rows at a time.
+
+    Like PngStreamWriter, rows are given in sample format, e.g. packed bits (np.packbits) for bit_depth=1,
+    and only the rows of the current row of tiles are kept in memory.
+    Tiles are deflated, with the horizontal predictor for 8-bit, and written as soon as a row of tiles is complete. The IFDs with the tile offsets follow at the end.
+    The reduced levels are 8-bit grayscale made by 2x2 averaging, until the level fits in one tile.
+    With palette, 1-bit level 0 is indexed color. Otherwise grayscale. BigTIFF is used if the file may exceed 4 GiB.
+    """
+    def __init__(self, path: str, width: int, height: int, dpi: int | None = None, compress_level: int = 6,
+                 compress_strategy: int = zlib.Z_DEFAULT_STRATEGY, bit_depth: int = 8, palette: list[tuple[int, int, int]] | None = None,
+                 tile_size: int = DEFAULT_TILE_SIZE, bigtiff: bool | None = None) -> None:
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.compress_level = compress_level
+        self.compress_strategy = compress_strategy
+        self.bit_depth = bit_depth
+        self.palette = palette
+        self.row_bytes = (width * bit_depth + 7) // 8
+        # gray value of each 1-bit sample for the reduced levels
+        self.gray_lut = np.array([palette[0][0], palette[1][0]] if palette else [0, 255], dtype=np.uint8)
+
+        self.levels = [_Level(width, height, bit_depth, tile_size)]
+        while max(self.levels[-1].width, self.levels[-1].height) > tile_size:
+            w, h = self.levels[-1].width, self.levels[-1].height
+            self.levels.append(_Level((w + 1) // 2, (h + 1) // 2, 8, tile_size))
+
+        self.bigtiff = sum(level.raw_size() for level in self.levels) > BIGTIFF_THRESHOLD if bigtiff is None else bigtiff
+        self.f = open(path, "wb")  # noqa: SIM115
+        if self.bigtiff:
+            self.f.write(b"II" + struct.pack("<HHHQ", 43, 8, 0, 0))
+        else:
+            self.f.write(b"II" + struct.pack("<HI", 42, 0))
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        """Append rows of level 0. rows is an uint8 array of shape (row_num, bytes per row)"""
+        if rows.shape[0] == 0:
+            return
+        if rows.shape[1] != self.row_bytes or self.levels[0].rows_written + len(self.levels[0].buf) + rows.shape[0] > self.height:
+            raise ValueError("Rows do not fit the image size")
+
+        self._append(self.levels[0], rows)
+        if len(self.levels) > 1:
+            gray = rows if self.bit_depth == 8 else self.gray_lut[np.unpackbits(rows, axis=1, count=self.width)]
+            self._feed_next(0, gray)
+
+    def _feed_next(self, index: int, gray: np.ndarray) -> None:
+        """Reduce the gray rows of the level and append them to the next level"""
+        level = self.levels[index]
+        if level.pending is not None:
+            gray = np.concatenate([level.pending, gray])
+            level.pending = None
+        if len(gray) % 2:
+            level.pending = gray[-1:]
+            gray = gray[:-1]
+        if len(gray) == 0:
+            return
+
+        reduced = _reduce(gray)
+        self._append(self.levels[index + 1], reduced)
+        if index + 2 < len(self.levels):
+            self._feed_next(index + 1, reduced)
+
+    def _append(self, level: _Level, rows: np.ndarray) -> None:
+        padded = np.zeros((len(rows), level.buf.shape[1]), dtype=np.uint8)
+        padded[:, :rows.shape[1]] = rows
+        level.buf = np.concatenate([level.buf, padded])
+        while len(level.buf) >= level.tile_size:
+            self._write_tile_row(level, level.buf[:level.tile_size])
+            level.buf = level.buf[level.tile_size:]
+
+    def _write_tile_row(self, level: _Level, rows: np.ndarray) -> None:
+        level.rows_written += len(rows)
+        if len(rows) < level.tile_size:  # the last row of tiles is padded to the full tile
+            rows = np.concatenate([rows, np.zeros((level.tile_size - len(rows), rows.shape[1]), dtype=np.uint8)])
+        if level.bit_depth == 8:
+            # horizontal predictor: difference to the left pixel, from the left edge of each tile
+            diff = rows.copy()
+            diff[:, 1:] -= rows[:, :-1]
+            diff[:, ::level.tile_row_bytes] = rows[:, ::level.tile_row_bytes]
+            rows = diff
+        for tx in range(level.tiles_x):
+            tile = rows[:, tx * level.tile_row_bytes:(tx + 1) * level.tile_row_bytes]
+            compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, zlib.MAX_WBITS, 8, self.compress_strategy)
+            data = compressor.compress(tile.tobytes()) + compressor.flush()
+            level.tile_offsets.append(self.f.tell())
+            level.tile_byte_counts.append(len(data))
+            self.f.write(data)
+
+    def _level_tags(self, index: int) -> list[tuple[int, int, list[int]]]:
+        level = self.levels[index]
+        photometric = 3 if index == 0 and self.palette else 1  # palette or min-is-black
+        offset_type = LONG8 if self.bigtiff else LONG
+        tags = [
+            (254, LONG, [0 if index == 0 else 1]),  # NewSubfileType. 1 for reduced resolution
+            (256, LONG, [level.width]),
+            (257, LONG, [level.height]),
+            (258, SHORT, [level.bit_depth]),
+            (259, SHORT, [8]),  # Compression. deflate
+            (262, SHORT, [photometric]),
+            (277, SHORT, [1]),  # SamplesPerPixel
+            (284, SHORT, [1]),  # PlanarConfiguration
+            (317, SHORT, [2 if level.bit_depth == 8 else 1]),  # Predictor. horizontal differencing is only for 8-bit
+            (322, LONG, [level.tile_size]),
+            (323, LONG, [level.tile_size]),
+            (324, offset_type, level.tile_offsets),
+            (325, offset_type, level.tile_byte_counts),
+        ]
+        if self.dpi is not None:
+            # resolution of a reduced level is lower by its scale
+            resolution = [self.dpi, 2 ** index]
+            tags += [(282, RATIONAL, resolution), (283, RATIONAL, resolution), (296, SHORT, [2])]  # inch
+        if photometric == 3 and self.palette is not None:
+            # 16-bit color map, all red values then green and blue
+            tags.append((320, SHORT, [color[c] * 257 for c in range(3) for color in self.palette]))
+        return sorted(tags)
+
+    def _write_ifd(self, tags: list[tuple[int, int, list[int]]]) -> tuple[int, int]:
+        """Write the IFD and its values at the end of the file. Returns offsets of the IFD and of its next IFD pointer"""
+        count_fmt, entry_fmt, ptr_fmt, inline_size = ("<Q", "<HHQ", "<Q", 8) if self.bigtiff else ("<H", "<HHI", "<I", 4)
+        if self.f.tell() % 2:
+            self.f.write(b"\0")
+        ifd_offset = self.f.tell()
+        ifd_size = struct.calcsize(count_fmt) + len(tags) * (struct.calcsize(entry_fmt) + inline_size) + struct.calcsize(ptr_fmt)
+
+        entries = struct.pack(count_fmt, len(tags))
+        extra = b""
+        for tag, field_type, values in tags:
+            fmt = _TYPE_FORMATS[field_type]
+            data = struct.pack(f"<{fmt * (len(values) // len(fmt) if field_type == RATIONAL else len(values))}", *values)
+            count = len(values) // 2 if field_type == RATIONAL else len(values)
+            entries += struct.pack(entry_fmt, tag, field_type, count)
+            if len(data) <= inline_size:
+                entries += data.ljust(inline_size, b"\0")
+            else:
+                entries += struct.pack(ptr_fmt, ifd_offset + ifd_size + len(extra))
+                extra += data + b"\0" * (len(data) % 2)
+
+        self.f.write(entries + struct.pack(ptr_fmt, 0) + extra)
+        return ifd_offset, ifd_offset + ifd_size - struct.calcsize(ptr_fmt)
+
+    def close(self) -> None:
+        if self.f.closed:
+            return
+        try:
+            level0 = self.levels[0]
+            if level0.rows_written + len(level0.buf) != self.height:
+                raise ValueError(f"Only {level0.rows_written + len(level0.buf)} of {self.height} rows were written")
+
+            # the last odd rows are paired with themselves
+            for index, level in enumerate(self.levels[:-1]):
+                if level.pending is not None:
+                    pending, level.pending = level.pending, None
+                    self._feed_next(index, np.concatenate([pending, pending]))
+            for level in self.levels:
+                if len(level.buf):
+                    self._write_tile_row(level, level.buf)
+
+            # IFDs of level 0 to the smallest level, chained by the next IFD pointers
+            ptr_fmt, ptr_offset = ("<Q", 8) if self.bigtiff else ("<I", 4)
+            for index in range(len(self.levels)):
+                ifd_offset, next_ptr_offset = self._write_ifd(self._level_tags(index))
+                end = self.f.tell()
+                self.f.seek(ptr_offset)
+                self.f.write(struct.pack(ptr_fmt, ifd_offset))
+                self.f.seek(end)
+                ptr_offset = next_ptr_offset
+        finally:
+            self.f.close()
+
+    def __enter__(self) -> "TiledTiffWriter":
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.f.close()
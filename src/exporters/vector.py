@@ -0,0 +1,223 @@
+import zlib
+from abc import ABC, abstractmethod
+from types import TracebackType
+
+BEZIER_ARC = 0.5522847  # control point distance of a quarter circle Bezier curve, relative to the radius
+PDF_MAX_PAGE_SIZE = 14400  # in user units. Longer pages are scaled by /UserUnit
+
+
+def _num(v: float) -> str:
+    return f"{v:.2f}".rstrip("0").rstrip(".")
+
+
+class VectorStreamWriter(ABC):
+    """Base of the vector image writers. Shapes are written to the file as they are given.
+
+    Coordinates are in pixels of the given DPI, from the top left like the raster image.
+    The physical size is width / dpi inches, so the output is independent of the DPI.
+    """
+    def __init__(self, path: str, width: int, height: int, dpi: int) -> None:
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.column_ids: dict[tuple[int, float, float], int] = {}  # (log2 of num, step, d) of the defined dot columns
+        self.f = open(path, "wb")  # noqa: SIM115
+
+    @abstractmethod
+    def fill(self, gray: int) -> None:
+        """Fill color of the following shapes, 0 - 255"""
+
+    @abstractmethod
+    def rect(self, x: float, y: float, w: float, h: float) -> None:
+        ...
+
+    @abstractmethod
+    def rounded_rect(self, x: float, y: float, w: float, h: float, r: float) -> None:
+        """The radius is reduced to half of the width and height"""
+
+    def dot_column(self, x: float, y: float, num: int, step: float, d: float) -> None:
+        """num circles of diameter d, step apart downwards from the top left (x, y).
+        Written as columns of power-of-two lengths, each defined once from two of the half length.
+        So a chain perforation of any length costs a few references.
+        """
+        for k in reversed(range(num.bit_length())):
+            if num >> k & 1:
+                self._use_column(self._power_column(k, step, d), x, y)
+                y += (1 << k) * step
+
+    def _power_column(self, k: int, step: float, d: float) -> int:
+        key = (k, step, d)
+        if key not in self.column_ids:
+            half_id = self._power_column(k - 1, step, d) if k > 0 else None
+            self.column_ids[key] = len(self.column_ids) + 1
+            self._define_column(self.column_ids[key], half_id, (1 << k) // 2 * step, d, ((1 << k) - 1) * step + d)
+        return self.column_ids[key]
+
+    @abstractmethod
+    def _define_column(self, column_id: int, half_id: int | None, half_offset: float, d: float, h: float) -> None:
+        """A single dot if half_id is None. Otherwise the half column at the top and at half_offset below"""
+
+    @abstractmethod
+    def _use_column(self, column_id: int, x: float, y: float) -> None:
+        ...
+
+    @abstractmethod
+    def _finish(self) -> None:
+        ...
+
+    def close(self) -> None:
+        if self.f.closed:
+            return
+        try:
+            self._finish()
+        finally:
+            self.f.close()
+
+    def __enter__(self) -> "VectorStreamWriter":
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.f.close()
+
+
+def _svg_href(column_id: int) -> str:
+    # xlink:href of SVG 1.1, as cutter and print software read it. SVG 2 readers accept it too
+    return f'xlink:href="#dots{column_id}"'
+
+
+class SvgStreamWriter(VectorStreamWriter):
+    """Write an SVG image. Shapes of the same fill are grouped."""
+    def __init__(self, path: str, width: int, height: int, dpi: int) -> None:
+        super().__init__(path, width, height, dpi)
+        self.group_open = False
+        self.f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.f.write(f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" width="{_num(width / dpi)}in" height="{_num(height / dpi)}in" '
+                     f'viewBox="0 0 {width} {height}">\n'.encode())
+
+    def fill(self, gray: int) -> None:
+        if self.group_open:
+            self.f.write(b"</g>\n")
+        self.f.write(f'<g fill="#{gray:02x}{gray:02x}{gray:02x}">\n'.encode())
+        self.group_open = True
+
+    def rect(self, x: float, y: float, w: float, h: float) -> None:
+        self.f.write(f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(w)}" height="{_num(h)}"/>\n'.encode())
+
+    def rounded_rect(self, x: float, y: float, w: float, h: float, r: float) -> None:
+        # SVG reduces rx and ry to half of the width and height by itself
+        self.f.write(f'<rect x="{_num(x)}" y="{_num(y)}" width="{_num(w)}" height="{_num(h)}" rx="{_num(r)}"/>\n'.encode())
+
+    def _define_column(self, column_id: int, half_id: int | None, half_offset: float, d: float, h: float) -> None:
+        # defined where first used. SVG allows definitions anywhere in the document
+        if half_id is None:
+            shapes = f'<circle cx="{_num(d / 2)}" cy="{_num(d / 2)}" r="{_num(d / 2)}"/>'
+        else:
+            shapes = f'<use {_svg_href(half_id)}/><use {_svg_href(half_id)} y="{_num(half_offset)}"/>'
+        self.f.write(f'<defs><g id="dots{column_id}">{shapes}</g></defs>\n'.encode())
+
+    def _use_column(self, column_id: int, x: float, y: float) -> None:
+        self.f.write(f'<use {_svg_href(column_id)} x="{_num(x)}" y="{_num(y)}"/>\n'.encode())
+
+    def _finish(self) -> None:
+        if self.group_open:
+            self.f.write(b"</g>\n")
+        self.f.write(b"</svg>\n")
+
+
+def _pdf_rounded_rect(x: float, y: float, w: float, h: float, r: float) -> str:
+    rx, ry = min(r, w / 2), min(r, h / 2)
+    kx, ky = rx * (1 - BEZIER_ARC), ry * (1 - BEZIER_ARC)
+    x1, y1 = x + w, y + h
+    sx, sy, sx1, sy1, xr, x1r, yr, y1r, xk, x1k, yk, y1k = (_num(v) for v in (x, y, x1, y1, x + rx, x1 - rx, y + ry, y1 - ry, x + kx, x1 - kx, y + ky, y1 - ky))
+    return (f"{xr} {sy} m {x1r} {sy} l {x1k} {sy} {sx1} {yk} {sx1} {yr} c {sx1} {y1r} l {sx1} {y1k} {x1k} {sy1} {x1r} {sy1} c "
+            f"{xr} {sy1} l {xk} {sy1} {sx} {y1k} {sx} {y1r} c {sx} {yr} l {sx} {yk} {xk} {sy} {xr} {sy} c f\n")
+
+
+class PdfStreamWriter(VectorStreamWriter):
+    """Write a single page PDF. The page content is deflated as it is written.
+
+    Objects which are known only at the end, i.e. the content length, the resources and the dot columns, follow the content.
+    """
+    def __init__(self, path: str, width: int, height: int, dpi: int) -> None:
+        super().__init__(path, width, height, dpi)
+        self.compressor = zlib.compressobj()
+        self.content_len = 0
+        self.offsets: list[int] = []
+        self.columns: list[tuple[int | None, float, float, str]] = []  # half column id, bounding box and content of form XObjects
+
+        # long rolls exceed the page size limit of PDF viewers, so a user unit is made larger than 1/72 inch
+        width_pt, height_pt = width * 72 / dpi, height * 72 / dpi
+        user_unit = max(1.0, max(width_pt, height_pt) / PDF_MAX_PAGE_SIZE)
+        page_w, page_h = width_pt / user_unit, height_pt / user_unit
+        scale = 72 / dpi / user_unit
+
+        self.f.write(b"%PDF-1.6\n%\xe2\xe3\xcf\xd3\n")
+        self._write_obj(b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._write_obj(b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>")
+        self._write_obj(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_num(page_w)} {_num(page_h)}] /UserUnit {user_unit:.6f} "
+                        "/Contents 4 0 R /Resources 6 0 R >>".encode())
+        self.offsets.append(self.f.tell())
+        self.f.write(b"4 0 obj\n<< /Length 5 0 R /Filter /FlateDecode >>\nstream\n")
+        # pixel coordinates from the top left
+        self._write_content(f"{scale:.8f} 0 0 {-scale:.8f} 0 {_num(page_h)} cm\n")
+
+    def _write_obj(self, body: bytes) -> None:
+        self.offsets.append(self.f.tell())
+        self.f.write(f"{len(self.offsets)} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _write_content(self, ops: str) -> None:
+        data = self.compressor.compress(ops.encode())
+        self.content_len += len(data)
+        self.f.write(data)
+
+    def fill(self, gray: int) -> None:
+        self._write_content(f"{gray / 255:.4f} g\n")
+
+    def rect(self, x: float, y: float, w: float, h: float) -> None:
+        self._write_content(f"{_num(x)} {_num(y)} {_num(w)} {_num(h)} re f\n")
+
+    def rounded_rect(self, x: float, y: float, w: float, h: float, r: float) -> None:
+        self._write_content(_pdf_rounded_rect(x, y, w, h, r))
+
+    def _define_column(self, column_id: int, half_id: int | None, half_offset: float, d: float, h: float) -> None:
+        # form XObject. It inherits the fill color and the transform of where it is used
+        if half_id is None:
+            content = _pdf_rounded_rect(0, 0, d, d, d / 2)
+        else:
+            content = f"/D{half_id} Do q 1 0 0 1 0 {_num(half_offset)} cm /D{half_id} Do Q\n"
+        self.columns.append((half_id, d, h, content))
+
+    def _use_column(self, column_id: int, x: float, y: float) -> None:
+        self._write_content(f"q 1 0 0 1 {_num(x)} {_num(y)} cm /D{column_id} Do Q\n")
+
+    def _finish(self) -> None:
+        data = self.compressor.flush()
+        self.content_len += len(data)
+        self.f.write(data)
+        self.f.write(b"\nendstream\nendobj\n")
+        self._write_obj(str(self.content_len).encode())  # 5
+
+        # 6. the dot columns are the objects from 7
+        xobjects = " ".join(f"/D{i + 1} {i + 7} 0 R" for i in range(len(self.columns)))
+        self._write_obj(f"<< /XObject << {xobjects} >> >>".encode())
+        for half_id, w, h, content in self.columns:
+            resources = "" if half_id is None else f"/Resources << /XObject << /D{half_id} {half_id + 6} 0 R >> >> "
+            self._write_obj(f"<< /Type /XObject /Subtype /Form /BBox [0 0 {_num(w)} {_num(h)}] {resources}/Length {len(content)} >>\n".encode()
+                            + b"stream\n" + content.encode() + b"\nendstream")
+
+        xref_offset = self.f.tell()
+        self.f.write(f"xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n".encode())
+        self.f.write(b"".join(f"{offset:010d} 00000 n \n".encode() for offset in self.offsets))
+        self.f.write(f"trailer\n<< /Size {len(self.offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def create_vector_writer(path: str, width: int, height: int, dpi: int) -> VectorStreamWriter:
+    """SVG or PDF writer by the file extension"""
+    if path.lower().endswith(".svg"):
+        return SvgStreamWriter(path, width, height, dpi)
+    if path.lower().endswith(".pdf"):
+        return PdfStreamWriter(path, width, height, dpi)
+    raise ValueError(f"Unsupported vector format: {path}")
@@ -0,0 +1,22 @@
+"""Icon images of the assets directory. Decoded on first use and cached."""
+from functools import cache
+
+import customtkinter as ctk
+from PIL import Image
+
+from const import ASSETS_DIR
+
+WARNING_ICON = f"{ASSETS_DIR}/warning_256dp_4B77D1_FILL0_wght400_GRAD0_opsz48.png"
+
+
+@cache
+def load_image(name: str) -> Image.Image:
+    image = Image.open(f"{ASSETS_DIR}/{name}")
+    image.load()
+    return image
+
+
+@cache
+def ctk_icon(light: str, dark: str | None = None, size: tuple[int, int] = (20, 20)) -> ctk.CTkImage:
+    """CTkImage of the icon files. dark is the icon of dark mode, the same as light if omitted"""
+    return ctk.CTkImage(light_image=load_image(light), dark_image=load_image(dark) if dark else None, size=size)
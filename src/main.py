@@ -1,32 +1,96 @@
+import startup_timer  # isort: skip  # first, to measure the import time of the others
+import math
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
 
 import customtkinter as ctk
-from CTkMessagebox import CTkMessagebox
 from PIL import Image, ImageTk
 from tkinterdnd2 import DND_ALL
 
 from config import ConfigMng
-from const import APP_HEIGHT, APP_TITLE, APP_WIDTH, ASSETS_DIR
+from const import (
+    APP_HEIGHT,
+    APP_TITLE,
+    APP_VERSION,
+    APP_WIDTH,
+    ASSETS_DIR,
+    COMPRESSION_PRESETS,
+    CONVERTER_CONFIG_PATHS,
+    IMAGE_MODES,
+    ROLL_VIEW_HEIGHT,
+    ROLL_VIEW_WIDTH,
+)
 from custom_widgets import CustomScrollableFrame, MyCTkFloatInput, MyCTkIntInput, MyTk
+from icons import WARNING_ICON, ctk_icon
 from roll_viewer import RollViewer
-from tracker_bars.base import CONVERTER_CONFIG_PATHS, create_converter
-from update_checker import NotifyUpdate
 from welcome_message import WelcomMessage
 
+# numpy, mido and the converters are imported on the first conversion, not at startup
+if TYPE_CHECKING:
+    from tracker_bars.base import BaseConverter
+    from tracker_bars.midi_roll import MidiRoll
+    from tracker_bars.stats import ConvertStats
+
+UPDATE_CHECK_DELAY_MS = 1000  # after the first frame, so that the check does not slow down the startup
+
+startup_timer.mark("imports")
+
+
+def show_warning(title: str, message: str) -> None:
+    from CTkMessagebox import CTkMessagebox
+
+    CTkMessagebox(icon=WARNING_ICON, title=title, message=message)
+
+
+def create_converter(name: str, conf: ConfigMng, dpi: int | None = None) -> "BaseConverter":
+    from tracker_bars.base import create_converter
+
+    return create_converter(name, conf, dpi)
+
 
 class MainFrame:
     def __init__(self, parent) -> None:
         self.parent = parent
         self.midi_file_path = None
+        self.midi_roll: MidiRoll | None = None  # parsed once per MIDI file, re-rendered on every setting change
+        self.last_stats: ConvertStats | None = None  # of the last preview render
+        self.save_thread: threading.Thread | None = None
+        self.save_progress = 0.0  # written by the save thread
+        self.save_result = False
+        # preview conversions run one by one on a worker thread. A newer setting change cancels the older ones
+        self.convert_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="convert")
+        self.convert_results: queue.Queue[tuple[int, bool, Image.Image | None, ConvertStats]] = queue.Queue()
+        self.convert_generation = 0  # of the latest request
+        self.shown_generation = 0  # of the result in the viewer
+        self.latest_converter: BaseConverter | None = None
         self.conf = ConfigMng()
+        startup_timer.mark("config")
         self.create_sidebar()
         self.main_view: RollViewer | WelcomMessage = WelcomMessage(self.parent)
         self.change_dark_light_mode(change_state=False)
+        startup_timer.mark("widgets")
+        self.parent.after_idle(self.on_first_frame)
+
+    def on_first_frame(self) -> None:
+        startup_timer.mark("first frame")
+        startup_timer.report(APP_VERSION)
 
         # update check
-        NotifyUpdate.check(self.conf)
+        def check_update():
+            from update_checker import NotifyUpdate
+
+            NotifyUpdate.check(self.conf)
+
+        self.parent.after(UPDATE_CHECK_DELAY_MS, check_update)
 
     def on_close(self, root):
+        # the preview in flight is not needed any more
+        if self.latest_converter is not None:
+            self.latest_converter.cancel()
+
         # save configs
         self.sync_conf()
         self.conf.save_config()
@@ -37,6 +101,8 @@ class MainFrame:
         # self.conf.input_dir will be set by file_sel()
         # self.conf.output_dir will be set by filsave_image_sel()
         self.conf.base_config["tracker"] = self.tracker_bar.get()
+        self.conf.base_config["image_mode"] = self.image_mode.get()
+        self.conf.base_config["compression"] = self.compression.get()
         self.conf.tracker_config["tempo"] = int(self.tempo_slider.get())
         self.conf.tracker_config["dpi"] = int(self.roll_dpi.get())
         self.conf.tracker_config["roll_width"] = float(self.roll_width.get())
@@ -51,7 +117,8 @@ class MainFrame:
         self.conf.tracker_config["accel_rate"] = float(self.accel_rate.get())
         # self.conf.update_notified_version will be set by NotifyUpdate.check()
 
-        self.conf.save_config()
+        # changes are saved once the edits settle. on_close saves immediately
+        self.conf.save_config_later()
 
     def change_tracker(self, dummy=None):
         self.conf.load_tracker_config(self.tracker_bar.get())
@@ -81,8 +148,8 @@ class MainFrame:
         self.accel_rate.insert(0, self.conf.tracker_config["accel_rate"])
 
         if self.tracker_bar.get() == "Aeolian 176-note":
-            self.detailed_setting_btn.pack(anchor="sw", side="left")
-        else:
+            self.create_icon_button("detailed_setting_btn", "settings", self.show_detailed_settings).pack(anchor="sw", side="left")
+        elif hasattr(self, "detailed_setting_btn"):
             self.detailed_setting_btn.pack_forget()
 
         self.convert()
@@ -92,26 +159,80 @@ class MainFrame:
             self.conf.base_config["dark_mode"] = not self.conf.base_config["dark_mode"]
         ctk.set_appearance_mode("Dark" if self.conf.base_config["dark_mode"] else "Light")
 
+    def get_preview_dpi(self) -> int:
+        # DPI at which the whole roll width just fits the viewer. Never exceeds the output DPI.
+        view_width = ROLL_VIEW_WIDTH * self.parent._get_widget_scaling()
+        roll_width = self.conf.tracker_config["roll_width"] + 2 * self.conf.tracker_config["roll_side_margin"]
+        return max(1, min(self.conf.tracker_config["dpi"], math.ceil(view_width / roll_width)))
+
     def convert(self, arg=None) -> None:
         self.sync_conf()
-        if self.midi_file_path is None:
+        if self.midi_roll is None:
             return
 
-        converter = create_converter(self.tracker_bar.get(), self.conf)
-        res = converter.convert(self.midi_file_path)
-        if not res:
-            CTkMessagebox(icon=f"{ASSETS_DIR}/warning_256dp_4B77D1_FILL0_wght400_GRAD0_opsz48.png", title="Conversion Error", message="Conversion Error happened")
+        # a newer setting change supersedes the conversion in flight
+        if self.latest_converter is not None:
+            self.latest_converter.cancel()
+        self.convert_generation += 1
+
+        # preview is rendered at the display resolution. The full DPI image is rendered on save.
+        converter = create_converter(self.tracker_bar.get(), self.conf, self.get_preview_dpi())
+        self.latest_converter = converter
+        self.convert_executor.submit(self._convert_worker, converter, self.midi_roll, self.convert_generation)
+
+        if self.convert_generation - 1 == self.shown_generation:  # not polling yet
+            self.busy_bar.pack(after=self.fileopen, padx=10, pady=(5, 0), anchor="w", fill="both")
+            self.busy_bar.start()
+            self.parent.after(50, self._poll_convert)
+
+    def _convert_worker(self, converter: "BaseConverter", roll: "MidiRoll", generation: int) -> None:
+        # runs in the conversion thread. A result is always queued, or _poll_convert would wait for it forever
+        res, image = False, None
+        try:
+            res = converter.render(roll)
+            image = converter.out_img if res else None
+        except Exception as e:
+            print(e)
+            res, image = False, None
+        finally:
+            self.convert_results.put((generation, res, image, converter.stats))
+
+    def _poll_convert(self):
+        # widgets are only touched in the Tk thread. Results of superseded conversions are dropped
+        while not self.convert_results.empty():
+            generation, res, image, stats = self.convert_results.get()
+            if generation != self.convert_generation:
+                continue
+
+            self.shown_generation = generation
+            if not res or image is None:
+                show_warning("Conversion Error", "Conversion Error happened")
+            else:
+                self.last_stats = stats
+                if isinstance(self.main_view, RollViewer):
+                    self.main_view.set_image(image)
+                else:
+                    self.main_view = RollViewer(self.parent, ROLL_VIEW_WIDTH, ROLL_VIEW_HEIGHT, image)
+                self.create_icon_button("info_btn", "info", self.show_image_info).pack(anchor="sw", side="left")
+
+        if self.shown_generation != self.convert_generation:
+            self.parent.after(50, self._poll_convert)
             return
 
-        if isinstance(self.main_view, RollViewer):
-            self.main_view.set_image(converter.out_img)
-        else:
-            self.main_view = RollViewer(self.parent, 900, 900, converter.out_img)
-
-        self.info_btn.pack(anchor="sw", side="left")
+        self.busy_bar.stop()
+        self.busy_bar.pack_forget()
 
     def _open_file(self, path):
+        from tracker_bars.midi_roll import load_midi
+
         print(path)
+        try:
+            self.midi_roll = load_midi(path)
+        except Exception as e:
+            print(e)
+            show_warning("Conversion Error", "Failed to read MIDI file")
+            return
+
         self.midi_file_path = path
         # change app title
         name = os.path.basename(self.midi_file_path)
@@ -127,31 +248,75 @@ class MainFrame:
         paths: tuple[str] = self.parent.tk.splitlist(event.data)  # parse filepath list
         path = paths[0]  # only one file is supported
         if not path.endswith(".mid"):
-            CTkMessagebox(icon=f"{ASSETS_DIR}/warning_256dp_4B77D1_FILL0_wght400_GRAD0_opsz48.png", title="Unsupported File", message="Not MIDI file")
+            show_warning("Unsupported File", "Not MIDI file")
         else:
             self._open_file(path)
 
     def save_image(self):
-        if self.midi_file_path is None:
+        if self.midi_roll is None or self.save_thread is not None:
             return
 
         name = os.path.basename(self.midi_file_path)
         default_savename = os.path.splitext(name)[0] + f" tempo{self.tempo_slider.get():.0f}.png"
-        if path:= ctk.filedialog.asksaveasfilename(title="Save Converted Image", initialfile=default_savename, filetypes=[("PNG file", "*.png")], initialdir=self.conf.base_config["output_dir"]):
-            dpi = int(self.roll_dpi.get())
-            self.main_view.image.save(path, dpi=(dpi, dpi))
+        filetypes = [("PNG file", "*.png"), ("TIFF file", "*.tif *.tiff"), ("SVG vector image", "*.svg"), ("PDF vector image", "*.pdf"),
+                     ("Hole list", "*.holes"), ("Hole list JSON", "*.json"), ("Hole list CSV", "*.csv")]
+        if path:= ctk.filedialog.asksaveasfilename(title="Save Converted Image", initialfile=default_savename, filetypes=filetypes, initialdir=self.conf.base_config["output_dir"]):
+            converter = create_converter(self.tracker_bar.get(), self.conf)
+            roll = self.midi_roll
+            mode = self.image_mode.get()
+            compression = self.compression.get()
+            tracker = self.tracker_bar.get()
+
+            def save():
+                if path.lower().endswith((".tif", ".tiff")):
+                    # tiled with reduced resolution levels, streamed like PNG
+                    self.save_result = converter.render_to_tiff(roll, path, mode=mode, compression=compression,
+                                                                progress=lambda ratio: setattr(self, "save_progress", ratio))
+                elif path.lower().endswith((".holes", ".json", ".csv")):
+                    self.save_result = converter.save_hole_list(roll, path, tracker)
+                elif path.lower().endswith((".svg", ".pdf")):
+                    self.save_result = converter.render_to_vector(roll, path, mode=mode, progress=lambda ratio: setattr(self, "save_progress", ratio))
+                else:
+                    # the full DPI image is streamed into the file band by band
+                    self.save_result = converter.render_to_png(roll, path, mode=mode, compression=compression,
+                                                               progress=lambda ratio: setattr(self, "save_progress", ratio))
+
+            # a large roll takes seconds to save. The window keeps responding while the worker thread saves.
+            # The thread is not daemon, so closing the window does not leave a broken file.
+            self.save_progress = 0.0
+            self.save_thread = threading.Thread(target=save)
+            self.save_thread.start()
+
+            self.save_btn.configure(state="disabled")
+            self.save_progress_bar.set(0)
+            self.save_progress_bar.pack(after=self.save_btn, padx=10, pady=(0, 10), anchor="w", fill="both")
+            self.parent.after(100, self._poll_save)
             self.conf.base_config["output_dir"] = os.path.dirname(path)
 
+    def _poll_save(self):
+        # widgets are only touched in the Tk thread
+        if self.save_thread is not None and self.save_thread.is_alive():
+            self.save_progress_bar.set(self.save_progress)
+            self.parent.after(100, self._poll_save)
+            return
+
+        self.save_thread = None
+        self.save_progress_bar.pack_forget()
+        self.save_btn.configure(state="normal")
+        if not self.save_result:
+            show_warning("Conversion Error", "Conversion Error happened")
+
     def show_image_info(self):
-        # show converted image info
-        img_w, img_h = self.main_view.image.size
+        # show converted image info. The viewer holds a preview, so calculate the size at output DPI
+        converter = create_converter(self.tracker_bar.get(), self.conf)
+        img_w, img_h = converter.get_image_size(self.midi_roll)
         dpi = int(self.roll_dpi.get())
         length = img_h / dpi / 12  # feet
 
         parent_x = self.parent.winfo_rootx()
         parent_y = self.parent.winfo_rooty()
         msgbox = ctk.CTkToplevel(self.parent)
-        msgbox.geometry(f"400x120+{parent_x + 150}+{parent_y + 150}")
+        msgbox.geometry(f"400x330+{parent_x + 150}+{parent_y + 150}")
         msgbox.title("Image Information")
         msgbox.grab_set()
 
@@ -160,8 +325,15 @@ class MainFrame:
         ctk.CTkLabel(msgbox, text=f"Height: {img_h} px ", font=font).pack(padx=10, pady=5, anchor="w")
         ctk.CTkLabel(msgbox, text=f"Length: {length:.1f} ft ({length * 0.3048:.1f} m) @{dpi}DPI", font=font).pack(padx=10, pady=5, anchor="w")
 
+        # stats of the last preview render
+        if (stats := self.last_stats) is not None:
+            ctk.CTkLabel(msgbox, text=f"Events: {stats.events}, Holes: {stats.holes}, Chain dots: {stats.chain_perforations}").pack(padx=10, pady=(15, 2), anchor="w")
+            ctk.CTkLabel(msgbox, text=f"MIDI load: {stats.load_sec * 1000:.0f} ms").pack(padx=10, pady=2, anchor="w")
+            ctk.CTkLabel(msgbox, text=f"Preview pairing: {stats.pairing_sec * 1000:.0f} ms, layout: {stats.layout_sec * 1000:.0f} ms").pack(padx=10, pady=2, anchor="w")
+            ctk.CTkLabel(msgbox, text=f"Preview raster: {stats.raster_sec * 1000:.0f} ms ({stats.canvas_pixels / 1e6:.1f} Mpx)").pack(padx=10, pady=2, anchor="w")
+
     def show_detailed_settings(self):
-        from tracker_bars.duoart_organ import DuoArtOrganSetting
+        from duoart_organ_setting import DuoArtOrganSetting
 
         parent_x = self.parent.winfo_rootx()
         parent_y = self.parent.winfo_rooty()
@@ -173,13 +345,22 @@ class MainFrame:
         self.parent.wait_window(detail_win)
         self.convert()
 
+    def create_icon_button(self, attr: str, icon: str, command) -> ctk.CTkButton:
+        """Small icon button at the sidebar bottom. Made on the first use, as most sessions never show it."""
+        if not hasattr(self, attr):
+            btnimg = ctk_icon(f"{icon}_256dp_000000_FILL0_wght400_GRAD0_opsz48.png", f"{icon}_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png")
+            setattr(self, attr, ctk.CTkButton(self.sidebar, text="", width=20, fg_color="transparent", hover_color=("gray70", "gray30"), image=btnimg, command=command))
+        return getattr(self, attr)
+
     def create_sidebar(self):
         sidebar = CustomScrollableFrame(self.parent, corner_radius=0, fg_color=("#CCCCCC", "#111111"))
         sidebar.grid(row=0, column=0, sticky="nsew")
+        self.sidebar = sidebar
 
-        btnimg = ctk.CTkImage(Image.open(f"{ASSETS_DIR}/folder_open_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png"), size=(25, 25))
+        btnimg = ctk_icon("folder_open_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png", size=(25, 25))
         self.fileopen = ctk.CTkButton(sidebar, text="Open MIDI", image=btnimg, command=self.file_sel)
         self.fileopen.pack(padx=10, pady=(10, 0), anchor="w", fill="both")
+        self.busy_bar = ctk.CTkProgressBar(sidebar, mode="indeterminate")  # shown while converting
 
         ctk.CTkLabel(sidebar, text="Tracker Bar").pack(padx=10, anchor="w")
         self.tracker_bar = ctk.CTkOptionMenu(sidebar, values=tuple(CONVERTER_CONFIG_PATHS.keys()), command=self.change_tracker)
@@ -237,22 +418,24 @@ class MainFrame:
         self.accel_rate = MyCTkFloatInput(sidebar, self.convert)
         self.accel_rate.pack(padx=25, anchor="w")
 
-        btnimg = ctk.CTkImage(Image.open(f"{ASSETS_DIR}/download_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png"), size=(25, 25))
-        save_btn = ctk.CTkButton(sidebar, text="Save Image", image=btnimg, command=self.save_image)
-        save_btn.pack(padx=10, pady=10, anchor="w", fill="both")
+        ctk.CTkLabel(sidebar, text="Output image mode").pack(padx=10, pady=(10, 0), anchor="w")
+        self.image_mode = ctk.CTkOptionMenu(sidebar, values=IMAGE_MODES)
+        self.image_mode.set(self.conf.base_config.get("image_mode", "gray"))
+        self.image_mode.pack(padx=10, anchor="w")
 
-        btnimg = ctk.CTkImage(light_image=Image.open(f"{ASSETS_DIR}/dark_mode_256dp_1F1F1F_FILL0_wght400_GRAD0_opsz48.png"),
-                                        dark_image=Image.open(f"{ASSETS_DIR}/light_mode_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png"), size=(20, 20))
-        dark_mode_btn = ctk.CTkButton(sidebar, text="", width=20, fg_color="transparent", hover_color=("gray70", "gray30"), image=btnimg, command=self.change_dark_light_mode)
-        dark_mode_btn.pack(anchor="sw", side="left")
+        ctk.CTkLabel(sidebar, text="PNG compression").pack(padx=10, anchor="w")
+        self.compression = ctk.CTkOptionMenu(sidebar, values=tuple(COMPRESSION_PRESETS.keys()))
+        self.compression.set(self.conf.base_config.get("compression", "balanced"))
+        self.compression.pack(padx=10, anchor="w")
 
-        btnimg = ctk.CTkImage(light_image=Image.open(f"{ASSETS_DIR}/info_256dp_000000_FILL0_wght400_GRAD0_opsz48.png"),
-                                        dark_image=Image.open(f"{ASSETS_DIR}/info_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png"), size=(20, 20))
-        self.info_btn = ctk.CTkButton(sidebar, text="", width=20, fg_color="transparent", hover_color=("gray70", "gray30"), image=btnimg, command=self.show_image_info)
+        btnimg = ctk_icon("download_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png", size=(25, 25))
+        self.save_btn = ctk.CTkButton(sidebar, text="Save Image", image=btnimg, command=self.save_image)
+        self.save_btn.pack(padx=10, pady=10, anchor="w", fill="both")
+        self.save_progress_bar = ctk.CTkProgressBar(sidebar)  # shown while saving
 
-        btnimg = ctk.CTkImage(light_image=Image.open(f"{ASSETS_DIR}/settings_256dp_000000_FILL0_wght400_GRAD0_opsz48.png"),
-                                        dark_image=Image.open(f"{ASSETS_DIR}/settings_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png"), size=(20, 20))
-        self.detailed_setting_btn = ctk.CTkButton(sidebar, text="", width=20, fg_color="transparent", hover_color=("gray70", "gray30"), image=btnimg, command=self.show_detailed_settings)
+        btnimg = ctk_icon("dark_mode_256dp_1F1F1F_FILL0_wght400_GRAD0_opsz48.png", "light_mode_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png")
+        dark_mode_btn = ctk.CTkButton(sidebar, text="", width=20, fg_color="transparent", hover_color=("gray70", "gray30"), image=btnimg, command=self.change_dark_light_mode)
+        dark_mode_btn.pack(anchor="sw", side="left")
 
         self.change_tracker()
 
@@ -1,9 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import customtkinter as ctk
 from PIL import Image
 
 Image.MAX_IMAGE_PIXELS = 10000000000
 
+MIPMAP_LEVELS = 4  # level 0 is the view width. Each next level is half size of the former one
+TILE_HEIGHT = 256  # px of level 0
+PREFETCH_VIEWS = 2  # number of view heights prepared ahead in the scroll direction
+FRAME_MS = 16  # at most one redraw per frame
+SETTLE_DELAY_MS = 150  # redraw from level 0 when scrolling stops
+
+
 class RollViewer:
+    """Scrollable view of roll image.
+
+    The image is scaled to the view width (mipmap level 0) in horizontal tiles, and a frame is composed of the tiles.
+    Coarser levels are used while the view jumps more than its height per frame, e.g. fast scrollbar drags.
+    Tiles ahead in the scroll direction and the coarser levels are prepared on a background thread,
+    and discarded when the image, the view width or the DPI scaling changes.
+    Scroll events only move the offset. Redraws are coalesced into at most one per frame.
+    """
     def __init__(self, parent, width, height, image: Image.Image):
         self.scrollbar = ctk.CTkScrollbar(parent, orientation="vertical", command=self.on_scrollbar)
         self.scrollbar.grid(row=0, column=2, sticky="ns")
@@ -12,8 +29,16 @@ class RollViewer:
         self.image_label._set_scaling(new_window_scaling=1.0, new_widget_scaling=1.0)  # disable scaling on image.
         self.image_label.grid(row=0, column=1, sticky="nsew")
 
+        self.base_width = width
         self.view_width = int(width * self.orig_scaling_ratio)
         self.view_height = int(height * self.orig_scaling_ratio)
+        self.tiles: dict[int, Image.Image] = {}  # level 0 tiles by index
+        self.mipmaps: dict[int, Image.Image] = {}  # coarser levels
+        self.prefetching: set[int] = set()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="RollViewer")
+        self.last_draw_offset_y = 0
+        self.settle_job: str | None = None
+        self.draw_job: str | None = None
 
         self.set_image(image)
 
@@ -27,35 +52,128 @@ class RollViewer:
         self.drag_start_y = None
 
     def on_resize(self, event):
+        # the scrollbar follows DPI scaling changes, while the image label is kept unscaled
+        scaling = self.scrollbar._get_widget_scaling()
+        if scaling != self.orig_scaling_ratio:
+            self.orig_scaling_ratio = scaling
+            self.image_label._set_scaling(new_window_scaling=1.0, new_widget_scaling=1.0)
+            self.view_width = int(self.base_width * scaling)
+            self.offset_y = int(self.offset_y * self.view_width / self.resize_img_w)
+            self.update_resize_ratio()
+            self.clear_cache()
+
         view_height = event.height
-        if view_height != self.view_height:
+        if view_height != self.view_height or not self.tiles:
             self.view_height = view_height
-            self.draw()
-            self.update_scrollbar()
+            self.request_draw()
+
+    def update_resize_ratio(self):
+        self.resize_img_w = self.view_width
+        self.resize_ratio = self.view_width / self.img_w
+        self.resize_img_h = max(int(self.img_h * self.resize_ratio), 1)
 
     def set_image(self, image: Image.Image):
         self.offset_y = 0
+        self.last_draw_offset_y = 0
         self.image = image
         self.img_w, self.img_h = self.image.size
-        self.resize_ratio = self.view_width / self.img_w
-        self.resize_img_h = int(self.img_h * self.resize_ratio)
+        self.update_resize_ratio()
+        self.clear_cache()
 
         # set initial frame
-        cropped = self.image.crop((0, 0, self.img_w, int(self.view_height / self.resize_ratio)))
-        cropped = cropped.resize((self.view_width, self.view_height))
-        tk_image = ctk.CTkImage(light_image=cropped, size=(self.view_width, self.view_height))
-        self.image_label.configure(image=tk_image)
-
+        self.draw()
         self.update_scrollbar()
 
+    def clear_cache(self):
+        # new containers, so that background jobs of the old image can't store into the new cache
+        self.tiles = {}
+        self.mipmaps = {}
+        self.prefetching = set()
+        self.executor.submit(self.build_mipmaps, self.image, self.resize_img_w, self.resize_img_h, self.mipmaps)
+
+    @staticmethod
+    def build_tile(image: Image.Image, index: int, width: int, height: int) -> Image.Image:
+        # resize with the source box keeps the tiles seamless
+        top = index * TILE_HEIGHT
+        tile_h = min(TILE_HEIGHT, height - top)
+        ratio = width / image.width
+        return image.resize((width, tile_h), box=(0, top / ratio, image.width, (top + tile_h) / ratio))
+
+    def get_tile(self, index: int) -> Image.Image:
+        if index not in self.tiles:
+            self.tiles[index] = self.build_tile(self.image, index, self.resize_img_w, self.resize_img_h)
+        return self.tiles[index]
+
+    def prefetch_tile(self, image: Image.Image, index: int, width: int, height: int, tiles: dict[int, Image.Image], prefetching: set[int]) -> None:
+        # runs in the background thread
+        if tiles is not self.tiles:
+            return  # the cache was discarded
+        tiles[index] = self.build_tile(image, index, width, height)
+        prefetching.discard(index)
+
+    def build_mipmaps(self, image: Image.Image, width: int, height: int, mipmaps: dict[int, Image.Image]) -> None:
+        # runs in the background thread
+        mipmap = image
+        for level in range(1, MIPMAP_LEVELS):
+            if mipmaps is not self.mipmaps:
+                return  # the cache was discarded
+            size = (max(width >> level, 1), max(height >> level, 1))
+            mipmap = mipmap.resize(size, Image.Resampling.BOX)
+            mipmaps[level] = mipmap
+
+    def prefetch(self, direction: int) -> None:
+        """Prepare level 0 tiles ahead of the view in the scroll direction"""
+        if direction > 0:
+            start = self.offset_y + self.view_height
+            end = start + self.view_height * PREFETCH_VIEWS
+        else:
+            end = self.offset_y
+            start = end - self.view_height * PREFETCH_VIEWS
+        last_index = (self.resize_img_h - 1) // TILE_HEIGHT
+        for index in range(max(start // TILE_HEIGHT, 0), min(end // TILE_HEIGHT, last_index) + 1):
+            if index not in self.tiles and index not in self.prefetching:
+                self.prefetching.add(index)
+                self.executor.submit(self.prefetch_tile, self.image, index, self.resize_img_w, self.resize_img_h, self.tiles, self.prefetching)
+
+    def compose(self) -> Image.Image:
+        """Level 0 image of the view, pasted from the tiles"""
+        frame = Image.new(self.image.mode, (self.view_width, self.view_height))
+        first = self.offset_y // TILE_HEIGHT
+        last = min((self.offset_y + self.view_height - 1) // TILE_HEIGHT, (self.resize_img_h - 1) // TILE_HEIGHT)
+        for index in range(first, last + 1):
+            frame.paste(self.get_tile(index), (0, index * TILE_HEIGHT - self.offset_y))
+        return frame
+
     def draw(self):
-        offset_y_org = int(self.offset_y / self.resize_ratio)
-        box = (0, offset_y_org, self.img_w, offset_y_org + int(self.view_height / self.resize_ratio))
-        cropped = self.image.crop(box)
-        cropped = cropped.resize((self.view_width, self.view_height))
+        # the coarser level, the more the view jumped since the last frame. Falls back to level 0 until it is built
+        move = self.offset_y - self.last_draw_offset_y
+        jump = abs(move) // max(self.view_height, 1)
+        level = min(jump.bit_length(), MIPMAP_LEVELS - 1)
+        if level not in self.mipmaps:
+            level = 0
+        self.last_draw_offset_y = self.offset_y
+
+        if level == 0:
+            cropped = self.compose()
+            self.prefetch(-1 if move < 0 else 1)
+        else:
+            mipmap = self.mipmaps[level]
+            scale = self.resize_img_w / mipmap.width
+            top = int(self.offset_y / scale)
+            cropped = mipmap.crop((0, top, mipmap.width, top + round(self.view_height / scale)))
+            cropped = cropped.resize((self.view_width, self.view_height), Image.Resampling.NEAREST)
+            # draw sharp again after scrolling stops
+            if self.settle_job is not None:
+                self.image_label.after_cancel(self.settle_job)
+            self.settle_job = self.image_label.after(SETTLE_DELAY_MS, self.settle)
+
         tk_image = ctk.CTkImage(light_image=cropped, size=(self.view_width, self.view_height))
         self.image_label.configure(image=tk_image)
 
+    def settle(self):
+        self.settle_job = None
+        self.draw()
+
     def clamp_offset(self):
         self.offset_y = max(0, min(self.offset_y, self.resize_img_h - self.view_height))
 
@@ -65,13 +183,19 @@ class RollViewer:
         self.scrollbar.set(top, bottom)
 
     def call_draw(self):
+        self.draw_job = None
         self.clamp_offset()
         self.draw()
         self.update_scrollbar()
 
+    def request_draw(self):
+        """Redraw at the next frame. Requests until then are merged into one redraw with the latest offset."""
+        if self.draw_job is None:
+            self.draw_job = self.image_label.after(FRAME_MS, self.call_draw)
+
     def on_mousewheel(self, event):
         self.offset_y -= event.delta * 2
-        self.image_label.after(0, self.call_draw)
+        self.request_draw()
 
     def on_scrollbar(self, *args):
         if args[0] == "moveto":
@@ -80,7 +204,7 @@ class RollViewer:
             lines = int(args[1])
             self.offset_y += lines * 30
 
-        self.image_label.after(0, self.call_draw)
+        self.request_draw()
 
     def on_left_click_press(self, event):
         self.drag_start_y = event.y
@@ -90,7 +214,7 @@ class RollViewer:
             dy = event.y - self.drag_start_y
             self.offset_y -= dy
             self.drag_start_y = event.y
-            self.image_label.after(0, self.call_draw)
+            self.request_draw()
 
     def on_left_click_release(self, event):
         self.drag_start_y = None
@@ -0,0 +1,36 @@
+"""Startup timing report, to track the time to the first frame.
+
+Import this before any other module, so that the import time of the others is measured.
+The report is printed, and also appended to the JSON lines file given by PLAYSK_STARTUP_LOG environment variable.
+"""
+import json
+import os
+import platform
+import sys
+import time
+
+_start = time.perf_counter()
+_marks: list[tuple[str, float]] = []
+
+
+def mark(stage: str) -> None:
+    """Record the end of a startup stage"""
+    _marks.append((stage, time.perf_counter() - _start))
+
+
+def report(version: str) -> None:
+    stages = {}
+    last_sec = 0.0
+    for stage, sec in _marks:
+        stages[stage] = round((sec - last_sec) * 1000, 1)
+        last_sec = sec
+    print("Startup: " + ", ".join(f"{stage} {ms:.0f} ms" for stage, ms in stages.items()) + f", total {last_sec * 1000:.0f} ms")
+
+    if path := os.environ.get("PLAYSK_STARTUP_LOG"):
+        record = {"version": version, "frozen": getattr(sys, "frozen", False), "platform": platform.platform(),
+                  "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "total_ms": round(last_sec * 1000, 1), "stages_ms": stages}
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(e)
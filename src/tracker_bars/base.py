@@ -1,17 +1,46 @@
-import os
-import time
+from collections.abc import Callable, Iterator
+from typing import Any, NamedTuple
 
-import mido
-from PIL import Image, ImageDraw
+import numpy as np
+from PIL import Image
 
 from config import ConfigMng
-from const import CONVERTER_CONFIG_PATHS
+from const import COMPRESSION_PRESETS, CONVERTER_CONFIG_PATHS, IMAGE_MODES
+from exporters.hole_list import HOLE_DTYPE, write_hole_list
+from exporters.png_stream import PngStreamWriter
+from exporters.tiff_tiled import TiledTiffWriter
+from exporters.vector import VectorStreamWriter, create_vector_writer
+
+from .hole_sprites import HoleSprites, stamp
+from .midi_roll import CONTROL_CHANGE, NOTE_OFF, NOTE_ON, MidiRoll, load_midi
+from .profile import TrackerProfile, compile_profile, config_hash, get_profile
+from .stats import ConvertStats
+from .tempo_map import TempoMap
+
+DEFAULT_BAND_HEIGHT = 1024  # px. height of a band in streaming render
+VECTOR_CHUNK_HOLES = 4096  # holes written between progress reports and cancel checks
+
+
+class ConvertCancelled(Exception):
+    """The conversion was stopped by BaseConverter.cancel()"""
+
+
+class HoleLayout(NamedTuple):
+    """Image coordinates of holes. Each field is an array with one element per hole."""
+    x: np.ndarray  # left edge
+    top: np.ndarray  # top edge of the hole (including chain perforation)
+    bottom: np.ndarray  # bottom edge of the hole
+    chain_num: np.ndarray  # number of chain perforation dots above the normal perforation
+    hole_no: np.ndarray  # tracker hole index, 0 at the leftmost hole
 
 
 class BaseConverter:
-    """88-note class for MIDI to Image conversion."""
-    def __init__(self, conf: ConfigMng) -> None:
-        self.roll_dpi = conf.tracker_config["dpi"]
+    """88-note class for MIDI to Image conversion.
+
+    dpi overrides the configured DPI, e.g. to render a low resolution preview.
+    """
+    def __init__(self, conf: ConfigMng, dpi: int | None = None) -> None:
+        self.roll_dpi = dpi or conf.tracker_config["dpi"]
         self.roll_tempo = conf.tracker_config["tempo"]
         self.roll_accelerate_rate_ft = float(conf.tracker_config["accel_rate"]) / 100 if conf.tracker_config["compensate_accel"] else 0
 
@@ -27,11 +56,6 @@ class BaseConverter:
         self.hole_num = 100
         self.roll_color = 120  # in grayscale
 
-        self.custom_hole_offsets: dict[int, dict[str, float]] = {
-            # 88-note is not used. For Duo-Art or Ampico etc...
-            # note_number: {"top hole offset": XX (inch), "bottom hole offset": XX (inch)}
-        }
-
         # in pixels
         self.roll_start_pad_px = int(self.roll_dpi * self.roll_start_pad)
         self.roll_end_pad_px = int(self.roll_dpi * self.roll_end_pad)
@@ -41,115 +65,283 @@ class BaseConverter:
         self.chain_perforation_spacing_px = int(self.roll_dpi * self.chain_hole_spacing)
         self.single_hole_max_len_px = int(self.roll_dpi * self.single_hole_max_len)
         self.shorten_hole_px = conf.tracker_config["shorten_len"]
-
-        self.control_change_map: dict[int, int] = {
-            # control_change_number: midiNoteNo
+        if dpi is not None:
+            # shorten length is specified in pixels of the configured DPI
+            self.shorten_hole_px = self.shorten_hole_px * self.roll_dpi / conf.tracker_config["dpi"]
+
+        self._profile: TrackerProfile | None = None  # compiled on first use, see profile
+        # rendered image as packed bits, 1 for holes and margins, 0 for the roll paper. rows are MSB first like np.packbits
+        self.canvas: np.ndarray | None = None
+        self.canvas_size = (0, 0)
+        self.cancelled = False  # set from another thread by cancel()
+        self.hole_sprites: HoleSprites | None = None
+        self.stats = ConvertStats()  # of the last conversion
+
+    def get_control_change_map(self) -> dict[int, int]:
+        # control_change_number: midiNoteNo
+        return {
             64: 18,
             67: 113,
         }
 
-        self.custom_note_map: dict[int, dict[int, int]] = {
-            # channel_no: {original_note_number: new_note_number, ...},
-            # not used in 88-note
-        }
-
-        self.hole_x_list = [self._get_hole_x(i) for i in range(128)]
-        self.out_img: Image.Image
-        self.draw: ImageDraw.ImageDraw
-
-    def get_roll_acceleration_rate(self, px: float) -> float:
+    def get_custom_note_map(self) -> dict[int, dict[int, int]]:
+        # channel_no: {original_note_number: new_note_number, ...},
+        # not used in 88-note
+        return {}
+
+    def get_custom_hole_offsets(self) -> dict[int, dict[str, float]]:
+        # 88-note is not used. For Duo-Art or Ampico etc...
+        # note_number: {"top_offset": XX (px), "bottom_offset": XX (px)}
+        return {}
+
+    def get_hole_x_list(self) -> list[int]:
+        return [self._get_hole_x(i) for i in range(128)]
+
+    @property
+    def profile(self) -> TrackerProfile:
+        """Lookup tables of this converter. The hook results are read once, and the same values are hashed for the cache key
+        and compiled, so a cached profile always matches its key. Tempo and other settings outside the tables don't change the key.
+        """
+        if self._profile is None:
+            control_change_map = self.get_control_change_map()
+            custom_note_map = self.get_custom_note_map()
+            custom_hole_offsets = self.get_custom_hole_offsets()
+            hole_x_list = self.get_hole_x_list()
+            key = config_hash({"control_change_map": control_change_map, "custom_note_map": custom_note_map,
+                               "custom_hole_offsets": custom_hole_offsets, "hole_x_list": hole_x_list})
+            self._profile = get_profile((key,), lambda: compile_profile(control_change_map, custom_note_map, custom_hole_offsets, hole_x_list))
+        return self._profile
+
+    def get_roll_acceleration_rate(self, px):
         cur_feet = px / self.roll_dpi / 12.0
-        return (1 + self.roll_accelerate_rate_ft) ** cur_feet
+        return np.power(1 + self.roll_accelerate_rate_ft, cur_feet)
 
     def _get_hole_x(self, note_no: int) -> int:
         return int(self.roll_dpi * (self.roll_margin + self.leftest_hole_center + ((note_no) * (self.rightest_hole_center - self.leftest_hole_center) / (self.hole_num - 1)) - (self.hole_width / 2)))
 
-    def get_tick_to_px(self, tick_len, tempo: int, bpm: float, ppq: int) -> float:
-        return ((tick_len * self.roll_dpi * tempo * 1.2) / (bpm * ppq))
+    def get_tempo_map(self, roll: MidiRoll) -> TempoMap:
+        return TempoMap(roll.tempo_ticks, roll.tempos, roll.ppq, self.roll_dpi, self.roll_tempo)
 
-    def draw_hole(self, note_no: int, tempo: int, bpm: float, ppq: int, on_tick: int, off_tick: int) -> None:
-        hole_h: float = self.get_tick_to_px(off_tick - on_tick, tempo, bpm, ppq)
-        hole_x: int = self.hole_x_list[note_no - 15]
-        hole_y1: float = self.get_tick_to_px(on_tick, tempo, bpm, ppq) + self.roll_start_pad_px
-        hole_y2: float = hole_y1 + hole_h
+    def layout_holes(self, note_no: np.ndarray, on_tick: np.ndarray, off_tick: np.ndarray, tempo_map: TempoMap, img_h: int) -> HoleLayout:
+        """Calculate the image coordinates of all holes at once"""
+        profile = self.profile
+        hole_h = tempo_map.interval_to_px(on_tick, off_tick)
+        hole_x = profile.hole_x[note_no]
+        hole_y1 = tempo_map.tick_to_px(on_tick) + self.roll_start_pad_px
+        hole_y2 = hole_y1 + hole_h
 
         # custom hole offsets
-        if (offset := self.custom_hole_offsets.get(note_no)) is not None:
-            hole_y1 += offset["top_offset"]
-            hole_y2 += offset["bottom_offset"]
+        hole_y1 += profile.top_offset[note_no]
+        hole_y2 += profile.bottom_offset[note_no]
 
         # default hole offsets
         hole_y1 += self.shorten_hole_px / 2
         hole_y2 += -self.shorten_hole_px / 2
         hole_h = hole_y2 - hole_y1
-        if hole_h < self.hole_width_px:
-            hole_y1 -= (self.hole_width_px - hole_h) // 2
-            hole_y2 += (self.hole_width_px - hole_h) // 2
+        extend = np.where(hole_h < self.hole_width_px, (self.hole_width_px - hole_h) // 2, 0.0)
+        hole_y1 -= extend
+        hole_y2 += extend
 
         # compensate roll acceleration
-        hole_y1 = int(hole_y1 * self.get_roll_acceleration_rate(hole_y1))
-        hole_y2 = int(hole_y2 * self.get_roll_acceleration_rate(hole_y2))
+        hole_y1 = (hole_y1 * self.get_roll_acceleration_rate(hole_y1)).astype(np.int64)
+        hole_y2 = (hole_y2 * self.get_roll_acceleration_rate(hole_y2)).astype(np.int64)
 
         # convert coordinates
-        hole_y1 = self.out_img.height - hole_y1
-        hole_y2 = self.out_img.height - hole_y2
+        hole_top = img_h - hole_y2
+        hole_bottom = img_h - hole_y1
+
+        # number of chain perforation dots
+        chain_step = max(self.chain_perforation_spacing_px + self.hole_width_px, 1)
+        chain_len = hole_bottom - self.single_hole_max_len_px - hole_top
+        chain_num = np.maximum(chain_len + chain_step - 1, 0) // chain_step
+
+        return HoleLayout(hole_x, hole_top, hole_bottom, chain_num, note_no - 15)
+
+    def draw_holes(self, band: np.ndarray, layout: HoleLayout, offset_y: int = 0) -> None:
+        """Draw holes into the bool band, shifted up by offset_y. Holes outside of the band are clipped."""
+        sprites = self.get_hole_sprites()
+        for hole_x, hole_top, hole_bottom, chain_num in zip(layout.x.tolist(), (layout.top - offset_y).tolist(), (layout.bottom - offset_y).tolist(), layout.chain_num.tolist()):
+            # Chain Perforation
+            y = hole_top
+            if chain_num > 0:
+                stamp(band, sprites.chain_run(chain_num), hole_x, y)
+                y += chain_num * sprites.chain_step
+
+            # Normal perforation
+            sprites.draw_rounded_rect(band, hole_x, y, hole_bottom - y)
+
+    def get_hole_sprites(self) -> HoleSprites:
+        """Hole shapes are rasterized once per converter, as all holes have the same width"""
+        if self.hole_sprites is None:
+            self.hole_sprites = HoleSprites(self.hole_width_px, max(self.chain_perforation_spacing_px + self.hole_width_px, 1))
+        return self.hole_sprites
+
+    def draw_band(self, layout: HoleLayout, img_w: int, band_y: int, band_h: int) -> np.ndarray:
+        """Draw the horizontal band of the roll image which starts at band_y.
+        Returns packed bits of shape (band_h, ceil(img_w / 8)). See self.canvas
+        """
+        band = np.zeros((band_h, img_w), dtype=bool)
+        band[:, :self.roll_margin_px + 1] = True
+        band[:, self.roll_margin_px + self.roll_width_px:] = True
+
+        # only the holes intersecting with the band
+        in_band = (layout.top < band_y + band_h) & (np.maximum(layout.bottom, layout.top + self.hole_width_px) >= band_y)
+        self.draw_holes(band, HoleLayout(*(v[in_band] for v in layout)), band_y)
+        return np.packbits(band, axis=1)
+
+    def unpack_gray(self, packed: np.ndarray, img_w: int) -> np.ndarray:
+        """Packed bits to 8-bit grayscale rows with the roll color"""
+        lut = np.array([self.roll_color, 255], dtype=np.uint8)
+        return lut[np.unpackbits(packed, axis=1, count=img_w)]
+
+    def to_image(self, mode: str = "gray") -> Image.Image:
+        """Rendered image in one of IMAGE_MODES"""
+        if self.canvas is None:
+            raise ValueError("Nothing is rendered")
+        img_w, img_h = self.canvas_size
+        if mode == "gray":
+            return Image.fromarray(self.unpack_gray(self.canvas, img_w), mode="L")
+        if mode == "mono":
+            return Image.frombytes("1", self.canvas_size, self.canvas.tobytes())
+        if mode == "indexed":
+            img = Image.frombytes("P", self.canvas_size, self.canvas.tobytes(), "raw", "P;1")
+            img.putpalette([self.roll_color] * 3 + [255] * 3)
+            return img
+        raise ValueError(f"Unknown image mode: {mode}")
+
+    @property
+    def out_img(self) -> Image.Image:
+        return self.to_image("gray")
+
+    def get_image_size(self, roll: MidiRoll) -> tuple[int, int]:
+        img_h = self.get_tempo_map(roll).tick_to_px(roll.total_ticks) + self.roll_start_pad_px + self.roll_end_pad_px
+        img_h = int(img_h * self.get_roll_acceleration_rate(img_h))
+        img_w = self.roll_width_px + 2 * self.roll_margin_px
+        return img_w, img_h
+
+    def pair_notes(self, roll: MidiRoll) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pair note on/off events into holes. Returns note_no, on_tick and off_tick arrays."""
+        note_on_ticks: list[int] = [0] * 512
+        hole_notes: list[int] = []
+        hole_on_ticks: list[int] = []
+        hole_off_ticks: list[int] = []
+
+        # map all events to holes at once. control changes which are not mapped get -1
+        profile = self.profile
+        hole = np.where(roll.status == CONTROL_CHANGE, profile.control_hole[roll.data1], profile.note_hole[roll.channel, roll.data1])
+
+        for abs_tick, status, note_no, data2 in zip(roll.ticks.tolist(), roll.status.tolist(), hole.tolist(), roll.data2.tolist()):
+            if status == CONTROL_CHANGE and note_no >= 0:
+                if data2 > 0:
+                    note_on_ticks[note_no] = abs_tick
+                elif note_on_ticks[note_no] != -1:
+                    hole_notes.append(note_no)
+                    hole_on_ticks.append(note_on_ticks[note_no])
+                    hole_off_ticks.append(abs_tick)
+                    note_on_ticks[note_no] = -1  # some midi has error, msg.value=0 multiple time. So, ignore it.
+
+            if status == NOTE_ON and data2 > 0:
+                note_on_ticks[note_no] = abs_tick
+            elif status == NOTE_OFF or (status == NOTE_ON and data2 == 0):
+                hole_notes.append(note_no)
+                hole_on_ticks.append(note_on_ticks[note_no])
+                hole_off_ticks.append(abs_tick)
+
+        return np.array(hole_notes, dtype=np.int64), np.array(hole_on_ticks, dtype=np.int64), np.array(hole_off_ticks, dtype=np.int64)
+
+    def prepare_layout(self, roll: MidiRoll) -> tuple[HoleLayout, int, int]:
+        """Returns the layout of all holes and the image size. Starts new stats of the conversion."""
+        self.stats = ConvertStats(load_sec=roll.load_sec, events=roll.event_num)
+        with self.stats.measure("pairing_sec"):
+            note_no, on_tick, off_tick = self.pair_notes(roll)
+        with self.stats.measure("layout_sec"):
+            img_w, img_h = self.get_image_size(roll)
+            layout = self.layout_holes(note_no, on_tick, off_tick, self.get_tempo_map(roll), img_h)
+
+        self.stats.holes = len(layout.x)
+        self.stats.chain_perforations = int(layout.chain_num.sum())
+        self.stats.canvas_pixels = img_w * img_h
+        return layout, img_w, img_h
+
+    def cancel(self) -> None:
+        """Stop the running render at the next band. Can be called from another thread."""
+        self.cancelled = True
+
+    def render(self, roll: MidiRoll, band_height: int = DEFAULT_BAND_HEIGHT) -> bool:
+        """Draw the roll image from already loaded MIDI events"""
+        try:
+            # all holes are laid out at once, then drawn into the canvas band by band
+            img_w, img_h = self.get_image_size(roll)
+            canvas = np.empty((img_h, (img_w + 7) // 8), dtype=np.uint8)
+            band_y = 0
+            for band in self.iter_bands(roll, band_height):
+                canvas[band_y:band_y + len(band)] = band
+                band_y += len(band)
+            self.canvas = canvas
+            self.canvas_size = (img_w, img_h)
+
+        except ConvertCancelled:
+            return False
 
-        # Chain Perforation
-        y = hole_y2
-        while y < hole_y1 - self.single_hole_max_len_px:
-            self.draw.ellipse([hole_x, y, hole_x + self.hole_width_px, y + self.hole_width_px], fill=255)
-            y += self.chain_perforation_spacing_px + self.hole_width_px
+        except Exception as e:
+            print(e)
+            return False
 
-        # Normal perforation
-        self.draw.rounded_rectangle([hole_x, y, hole_x + self.hole_width_px, hole_y1], radius=self.hole_width_px // 2, fill=255)
+        return True
 
-    def convert(self, midi_path: str) -> bool:
+    def iter_bands(self, roll: MidiRoll, band_height: int = DEFAULT_BAND_HEIGHT) -> Iterator[np.ndarray]:
+        """Draw the roll image band by band from the top, as packed bits. Only one band is kept in memory.
+        Raises ConvertCancelled when cancel() is called.
+        """
+        # layout of a long roll takes a while, so a cancel before or during it is checked too
+        if self.cancelled:
+            raise ConvertCancelled()
+        layout, img_w, img_h = self.prepare_layout(roll)
+        if self.cancelled:
+            raise ConvertCancelled()
+        for band_y in range(0, img_h, band_height):
+            if self.cancelled:
+                raise ConvertCancelled()
+            with self.stats.measure("raster_sec"):
+                band = self.draw_band(layout, img_w, band_y, min(band_height, img_h - band_y))
+            yield band
+
+    def render_to_png(self, roll: MidiRoll, savepath: str, band_height: int = DEFAULT_BAND_HEIGHT, mode: str = "gray",
+                      compression: str = "balanced", progress: Callable[[float], None] | None = None) -> bool:
+        """Draw the roll image and stream it into PNG file without holding the whole image.
+        Peak memory depends on band_height, not on the roll length.
+        mode is one of IMAGE_MODES. "indexed" and "mono" are written as 1-bit PNG.
+        compression is a key of COMPRESSION_PRESETS. progress is called with the written ratio (0.0 - 1.0) after each band.
+        """
+        return self._render_to_stream(PngStreamWriter, roll, savepath, band_height, mode, compression, progress)
+
+    def render_to_tiff(self, roll: MidiRoll, savepath: str, band_height: int = DEFAULT_BAND_HEIGHT, mode: str = "gray",
+                       compression: str = "balanced", progress: Callable[[float], None] | None = None) -> bool:
+        """Same as render_to_png(), but into a tiled TIFF with reduced resolution levels.
+        Viewers open any part of a long roll without decoding the whole image.
+        """
+        return self._render_to_stream(TiledTiffWriter, roll, savepath, band_height, mode, compression, progress)
+
+    def _render_to_stream(self, writer_class: type[PngStreamWriter | TiledTiffWriter], roll: MidiRoll, savepath: str, band_height: int, mode: str,
+                          compression: str, progress: Callable[[float], None] | None) -> bool:
         try:
-            mid = mido.MidiFile(midi_path)
-            ppq = mid.ticks_per_beat
-            bpm = 80.0
-
-            note_on_ticks: list[int] = [0] * 512
-            initialized = False
-            total_ticks = 0
-            for track in mid.tracks:
-                total_ticks = max(sum([t.time for t in track]), total_ticks)
-
-            for track in mid.tracks:
-                abs_tick = 0
-                for msg in track:
-                    abs_tick += msg.time
-
-                    if msg.type == "set_tempo" and not initialized:
-                        bpm = 60_000_000.0 / msg.tempo
-                        print(f"Tempo event at tick {abs_tick}: {bpm:.2f} BPM")
-
-                        # create image
-                        img_h = self.get_tick_to_px(total_ticks, self.roll_tempo, bpm, ppq) + self.roll_start_pad_px + self.roll_end_pad_px
-                        print(bpm, ppq, total_ticks, img_h)
-                        img_h = int(img_h * self.get_roll_acceleration_rate(img_h))
-                        img_w = self.roll_width_px + 2 * self.roll_margin_px
-                        self.out_img = Image.new("L", (img_w, img_h), color=self.roll_color)
-                        self.draw = ImageDraw.Draw(self.out_img)
-                        self.draw.rectangle([0, 0, self.roll_margin_px, img_h], fill=255)
-                        self.draw.rectangle([self.roll_margin_px + self.roll_width_px, 0, img_w, img_h], fill=255)
-                        initialized = True
-
-                    if msg.type in ("note_on", "note_off", "control_change"):
-                        if msg.type == "control_change" and msg.control in self.control_change_map:
-                            mapped_note_no = self.control_change_map[msg.control]
-                            if msg.value > 0:
-                                note_on_ticks[mapped_note_no] = abs_tick
-                            elif note_on_ticks[mapped_note_no] != -1:
-                                self.draw_hole(mapped_note_no, self.roll_tempo, bpm, ppq, note_on_ticks[mapped_note_no], abs_tick)
-                                note_on_ticks[mapped_note_no] = -1  # some midi has error, msg.value=0 multiple time. So, ignore it.
-
-                        if msg.type == "note_on" and msg.velocity > 0:
-                            note_no = self.custom_note_map.get(msg.channel, {}).get(msg.note, msg.note)
-                            note_on_ticks[note_no] = abs_tick
-                        elif msg.type == "note_off" or (msg.type == "note_on" and msg.velocity == 0):
-                            note_no = self.custom_note_map.get(msg.channel, {}).get(msg.note, msg.note)
-                            self.draw_hole(note_no, self.roll_tempo, bpm, ppq, note_on_ticks[note_no], abs_tick)
+            if mode not in IMAGE_MODES:
+                raise ValueError(f"Unknown image mode: {mode}")
+            img_w, img_h = self.get_image_size(roll)
+            bit_depth = 8 if mode == "gray" else 1
+            palette = [(self.roll_color,) * 3, (255,) * 3] if mode == "indexed" else None
+            rows_done = 0
+            level, strategy = COMPRESSION_PRESETS[compression]
+            with writer_class(savepath, img_w, img_h, self.roll_dpi, level, strategy, bit_depth, palette) as writer:
+                for band in self.iter_bands(roll, band_height):
+                    with self.stats.measure("encode_sec"):
+                        writer.write_rows(self.unpack_gray(band, img_w) if mode == "gray" else band)
+                    rows_done += len(band)
+                    if progress is not None:
+                        progress(rows_done / img_h)
+
+        except ConvertCancelled:
+            return False
 
         except Exception as e:
             print(e)
@@ -157,42 +349,128 @@ class BaseConverter:
 
         return True
 
-    def saveimg(self, savepath: str) -> None:
-        if self.out_img is not None:
-            self.out_img.save(savepath)
+    def draw_vector_holes(self, writer: VectorStreamWriter, layout: HoleLayout) -> None:
+        """Write the same hole shapes as draw_holes() as vector shapes. Shapes cover the pixels the raster image fills."""
+        w = self.hole_width_px + 1
+        radius = self.hole_width_px // 2
+        chain_step = max(self.chain_perforation_spacing_px + self.hole_width_px, 1)
+        for hole_x, hole_top, hole_bottom, chain_num in zip(layout.x.tolist(), layout.top.tolist(), layout.bottom.tolist(), layout.chain_num.tolist()):
+            # Chain Perforation
+            y = hole_top
+            if chain_num > 0:
+                writer.dot_column(hole_x, y, chain_num, chain_step, w)
+                y += chain_num * chain_step
+
+            # Normal perforation
+            if hole_bottom < y:
+                raise ValueError("y1 must be greater than or equal to y0")
+            writer.rounded_rect(hole_x, y, w, hole_bottom - y + 1, radius)
+
+    def render_to_vector(self, roll: MidiRoll, savepath: str, mode: str = "gray", progress: Callable[[float], None] | None = None) -> bool:
+        """Write the roll as vector shapes into SVG or PDF file, by the file extension.
+        Shapes are streamed into the file as they are generated. Pixel coordinates of the converter DPI are scaled to inches.
+        mode is one of IMAGE_MODES. "mono" draws the roll in black, the others in the roll color.
+        progress is called with the written ratio (0.0 - 1.0).
+        """
+        try:
+            if mode not in IMAGE_MODES:
+                raise ValueError(f"Unknown image mode: {mode}")
+            layout, img_w, img_h = self.prepare_layout(roll)
+            hole_num = len(layout.x)
+            with self.stats.measure("encode_sec"), create_vector_writer(savepath, img_w, img_h, self.roll_dpi) as writer:
+                # margins, then the roll paper. the same columns as draw_band()
+                writer.fill(255)
+                writer.rect(0, 0, img_w, img_h)
+                writer.fill(0 if mode == "mono" else self.roll_color)
+                writer.rect(self.roll_margin_px + 1, 0, self.roll_width_px - 1, img_h)
+
+                writer.fill(255)
+                for start in range(0, hole_num, VECTOR_CHUNK_HOLES):
+                    if self.cancelled:
+                        raise ConvertCancelled
+                    self.draw_vector_holes(writer, HoleLayout(*(v[start:start + VECTOR_CHUNK_HOLES] for v in layout)))
+                    if progress is not None:
+                        progress(min(start + VECTOR_CHUNK_HOLES, hole_num) / hole_num)
+
+        except ConvertCancelled:
+            return False
 
+        except Exception as e:
+            print(e)
+            return False
 
-def create_converter(name: str, conf: ConfigMng) -> BaseConverter:
+        return True
+
+    def save_hole_list(self, roll: MidiRoll, savepath: str, tracker: str) -> bool:
+        """Save the holes as a list instead of an image. Binary .holes, .json or .csv by the file extension.
+        Positions are the same as the image at the converter DPI, in inches from the roll start.
+        """
+        try:
+            layout, img_w, img_h = self.prepare_layout(roll)
+            with self.stats.measure("encode_sec"):
+                holes = np.empty(len(layout.x), dtype=HOLE_DTYPE)
+                holes["hole_no"] = layout.hole_no
+                holes["chain_num"] = layout.chain_num
+                # the roll starts at the bottom of the image. edges of the pixel rows top to bottom
+                holes["start"] = (img_h - layout.bottom - 1) / self.roll_dpi
+                holes["end"] = (img_h - layout.top) / self.roll_dpi
+                holes = holes[np.argsort(holes["start"], kind="stable")]
+
+                header = {"tracker": tracker, "dpi": self.roll_dpi, "tempo": self.roll_tempo,
+                          "accel_rate": self.roll_accelerate_rate_ft * 100,  # %/feet. 0 if not compensated
+                          "hole_num": self.hole_num, "hole_width": self.hole_width, "roll_width": img_w / self.roll_dpi, "roll_length": img_h / self.roll_dpi}
+                write_hole_list(savepath, header, holes)
+
+        except Exception as e:
+            print(e)
+            return False
+
+        return True
+
+    def convert(self, midi_path: str) -> bool:
+        try:
+            roll = load_midi(midi_path)
+        except Exception as e:
+            print(e)
+            return False
+
+        return self.render(roll)
+
+    def saveimg(self, savepath: str, mode: str = "gray", compression: str = "balanced") -> bool:
+        """Save the rendered image as PNG or TIFF, by the file extension.
+        mode is one of IMAGE_MODES, compression is a key of COMPRESSION_PRESETS. It only applies to PNG.
+        """
+        try:
+            with self.stats.measure("encode_sec"):
+                if savepath.lower().endswith((".tif", ".tiff")):
+                    # Pillow has no zlib level option of TIFF
+                    options: dict[str, Any] = {"compression": "group4" if mode == "mono" else "tiff_deflate"}
+                else:
+                    level, strategy = COMPRESSION_PRESETS[compression]
+                    options = {"compress_level": level, "compress_type": strategy, "optimize": compression == "smallest"}
+                self.to_image(mode).save(savepath, dpi=(self.roll_dpi, self.roll_dpi), **options)
+
+        except Exception as e:
+            print(e)
+            return False
+
+        return True
+
+
+def create_converter(name: str, conf: ConfigMng, dpi: int | None = None) -> BaseConverter:
     """Simple factory method of converter class"""
     convert_name = tuple(CONVERTER_CONFIG_PATHS.keys())
     if name == convert_name[1]:
         from tracker_bars.ampico import AmpicoA
-        return AmpicoA(conf)
+        return AmpicoA(conf, dpi)
     if name == convert_name[2]:
         from tracker_bars.ampico import AmpicoB
-        return AmpicoB(conf)
+        return AmpicoB(conf, dpi)
     elif name == convert_name[3]:
         from tracker_bars.duoart_organ import DuoArtOrgan
-        return DuoArtOrgan(conf)
+        return DuoArtOrgan(conf, dpi)
     elif name == convert_name[4] or name == convert_name[0]:
-        return BaseConverter(conf)
+        return BaseConverter(conf, dpi)
     else:
         raise ValueError(f"Unknown converter type: {name}")
 
-
-if __name__ == "__main__":
-    input_dir = "C:\\Users\\sasaki\\Downloads\\Ampico_All_erolls\\test\\"
-    output_dir = "output/classic/"
-    for filename in os.listdir(input_dir):
-        if filename.lower().endswith(".mid"):
-            path = os.path.join(input_dir, filename)
-            conf = ConfigMng()
-            t1 = time.time()
-            m2i = BaseConverter(conf)
-            m2i.convert(path)
-            save_path = os.path.join(output_dir, os.path.basename(filename).replace(".mid", f" tempo{m2i.roll_tempo}.png"))
-            os.makedirs(os.path.dirname(save_path), exist_ok=True)
-            m2i.saveimg(save_path)
-
-            print(f"Saved image to {save_path}")
-            print(time.time() - t1, "sec")
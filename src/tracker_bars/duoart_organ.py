@@ -1,29 +1,33 @@
-import customtkinter as ctk
+import copy
 
 from config import ConfigMng
-from custom_widgets import CustomScrollableFrame, MyCTkFloatInput, MyCTkIntInput
 
 from .base import BaseConverter
 
 
 class DuoArtOrgan(BaseConverter):
-    def __init__(self, conf: ConfigMng) -> None:
-        super().__init__(conf)
+    def __init__(self, conf: ConfigMng, dpi: int | None = None) -> None:
+        super().__init__(conf, dpi)
         self.hole_num = 176
-        tracker = conf.tracker_config["detailed_settings"]
-        self.vertical_offset = tracker["vertical_offset"]
+        self.detailed_settings = copy.deepcopy(conf.tracker_config["detailed_settings"])  # the GUI edits the original while converting
+        self.vertical_offset = self.detailed_settings["vertical_offset"]
         self.vertical_offset_px = int(self.roll_dpi * self.vertical_offset)
 
-        self.custom_hole_offsets: dict[int, dict[str, float]] = {
+    def get_custom_hole_offsets(self) -> dict[int, dict[str, float]]:
+        return {
             note_no + 15: {"top_offset": -self.vertical_offset_px, "bottom_offset": -self.vertical_offset_px}  for note_no in range(0, 256, 2)
         }
 
-        self.control_change_map = {}  # not used
+    def get_control_change_map(self) -> dict[int, int]:
+        return {}  # not used
+
+    def get_custom_note_map(self) -> dict[int, dict[int, int]]:
         # map hole_no and note_no
-        self.custom_note_map = {}
+        tracker = self.detailed_settings
+        custom_note_map: dict[int, dict[int, int]] = {}
         for key in ("Lower control holes (Great)", "Upper control holes (Swell)"):
             channel = tracker[key]["Midi Channel"] - 1
-            self.custom_note_map[channel] = {v["midi_note_no"]: v["hole_no"] + 15 for v in tracker[key]["Holes"].values()}
+            custom_note_map[channel] = {v["midi_note_no"]: v["hole_no"] + 15 for v in tracker[key]["Holes"].values()}
         for key in ("Lower playing 58 notes (Great)", "Upper playing 58 notes (Swell)"):
             lowest_hole_no = tracker[key]["Holes"]["Lowest Note"]["hole_no"]
             highest_hole_no = tracker[key]["Holes"]["Highest Note"]["hole_no"]
@@ -31,8 +35,7 @@ class DuoArtOrgan(BaseConverter):
             midi_note_no = lowest_midi_note_no
             for hole_no in range(lowest_hole_no, highest_hole_no + 1, 2):
                 channel = tracker[key]["Midi Channel"] - 1
-                self.custom_note_map.setdefault(channel, {})
-                self.custom_note_map[channel] |= {midi_note_no: hole_no + 15}
+                custom_note_map.setdefault(channel, {})[midi_note_no] = hole_no + 15
                 midi_note_no += 1
 
         # self.custom_note_map = {
@@ -48,84 +51,7 @@ class DuoArtOrgan(BaseConverter):
         #     2: {note_no: note_no * 2 - 24 for note_no in range(127)},  # upper keyboard
         #     5: {note_no: 95 + note_no for note_no in range(68, 100)} | {note_no: note_no - 21 for note_no in range(21, 68)},  # lower control holes
         # }
-        self.hole_x_list = [self._get_hole_x(i) for i in range(256)]
-
-
-class DuoArtOrganSetting(CustomScrollableFrame):
-    def __init__(self, parent: ctk.CTk, conf: ConfigMng) -> None:
-        super().__init__(parent)
-        self.detailed_settings = conf.tracker_config.get("detailed_settings", {})
-
-        self.pack(fill="both", expand=True)
-
-        # vertical offset
-        ctk.CTkLabel(self, text="Upper/Lower holes Vertical Offset (inch)").pack(side="top")
-        tmp = MyCTkFloatInput(self, width=50)
-        tmp.insert(0, self.detailed_settings["vertical_offset"])
-        tmp.pack(side="top")
-        left_frame = ctk.CTkFrame(self)
-        left_frame.pack(side="left", anchor="nw")
-        right_frame = ctk.CTkFrame(self)
-        right_frame.pack(side="right", anchor="ne")
-        self.detailed_settings["vertical_offset_edit"] = tmp
-
-        row_no = 0
-        frame = left_frame
-        for key in ("Upper playing 58 notes (Swell)", "Upper control holes (Swell)",
-                    "Lower playing 58 notes (Great)", "Lower control holes (Great)"):
-            val = self.detailed_settings[key]
-            if key == "Lower playing 58 notes (Great)":
-                row_no = 0
-                frame = right_frame
-
-            # label
-            font = ctk.CTkFont(size=20)
-            section = ctk.CTkLabel(frame, text=key, font=font)
-            section.grid(row=row_no, column=0, columnspan=3, padx=5, pady=(30, 10))
-            row_no += 1
-
-            # MIDI Channel
-            ctk.CTkLabel(frame, text="Midi Channel").grid(row=row_no, column=0, padx=5, pady=5)
-            tmp = ctk.CTkComboBox(frame, values=[str(i) for i in range(1, 16 + 1)], width=80)
-            tmp.set(val["Midi Channel"])
-            tmp.grid(row=row_no, column=1, padx=5, pady=5)
-            row_no += 1
-            self.detailed_settings[key]["midi_ch_edit"] = tmp
-
-            # header
-            headers = ["Hole No", "Name", "MIDI Note No"]
-            for i, text in enumerate(headers):
-                label = ctk.CTkLabel(frame, text=text)
-                label.grid(row=row_no, column=i, padx=5, pady=5)
-            row_no += 1
-
-            for hole_name, val2 in val["Holes"].items():
-                # Hole No.
-                hole_label = ctk.CTkLabel(frame, text=str(val2["hole_no"]))
-                hole_label.grid(row=row_no, column=0, padx=5, pady=2)
-
-                # Name
-                name_entry = ctk.CTkLabel(frame, text=hole_name)
-                name_entry.grid(row=row_no, column=1, padx=5, pady=2)
-
-                # Note Number
-                tmp = MyCTkIntInput(frame, width=50)
-                tmp.insert(0, val2["midi_note_no"])
-                tmp.grid(row=row_no, column=2, padx=5, pady=2)
-                self.detailed_settings[key]["Holes"][hole_name]["midi_noteno_edit"] = tmp
-                row_no += 1
-
-    def destroy(self):
-        self.detailed_settings["vertical_offset"] = float(self.detailed_settings["vertical_offset_edit"].get())
-        self.detailed_settings.pop("vertical_offset_edit")
-
-        for key in ("Upper playing 58 notes (Swell)", "Upper control holes (Swell)",
-                    "Lower playing 58 notes (Great)", "Lower control holes (Great)"):
-            val = self.detailed_settings[key]
-            self.detailed_settings[key]["Midi Channel"] = int(val["midi_ch_edit"].get())
-            self.detailed_settings[key].pop("midi_ch_edit")
+        return custom_note_map
 
-            for hole_name, val2 in val["Holes"].items():
-                self.detailed_settings[key]["Holes"][hole_name]["midi_note_no"] = int(val2["midi_noteno_edit"].get())
-                self.detailed_settings[key]["Holes"][hole_name].pop("midi_noteno_edit")
-        super().destroy()
+    def get_hole_x_list(self) -> list[int]:
+        return [self._get_hole_x(i) for i in range(256)]
@@ -0,0 +1,69 @@
+import numpy as np
+from PIL import Image, ImageDraw
+
+
+def stamp(band: np.ndarray, sprite: np.ndarray, x: int, y: int) -> None:
+    """OR the bool sprite into the bool band at (x, y). Parts outside of the band are clipped."""
+    h, w = sprite.shape
+    y0, y1 = max(y, 0), min(y + h, band.shape[0])
+    x0, x1 = max(x, 0), min(x + w, band.shape[1])
+    if y0 < y1 and x0 < x1:
+        band[y0:y1, x0:x1] |= sprite[y0 - y:y1 - y, x0 - x:x1 - x]
+
+
+class HoleSprites:
+    """Hole shapes of one hole width, rasterized by PIL once and stamped many times.
+
+    PIL rasterizes these shapes the same at any integer position, so stamps are pixel-identical to ImageDraw.
+    A rounded rectangle with y1 - y0 > 2 * radius + 2 is the top cap, full rows, then the bottom cap.
+    Shorter ones are rasterized as a whole.
+    """
+    def __init__(self, hole_w: int, chain_step: int) -> None:
+        self.hole_w = hole_w
+        self.radius = hole_w // 2
+        self.chain_step = chain_step
+        self.dot = self._rasterize(hole_w, lambda draw: draw.ellipse([0, 0, hole_w, hole_w], fill=1))
+
+        cap_h = self.radius + 1
+        tall = self._rounded_rect(2 * cap_h + 1)
+        self.top_cap = tall[:cap_h]
+        self.bottom_cap = tall[-cap_h:]
+        self.rects: dict[int, np.ndarray] = {}  # short rounded rectangles by height
+        self.chain_runs: dict[int, np.ndarray] = {}  # by number of dots
+
+    def _rasterize(self, h: int, func) -> np.ndarray:
+        img = Image.new("1", (self.hole_w + 1, h + 1))
+        func(ImageDraw.Draw(img))
+        return np.asarray(img)
+
+    def _rounded_rect(self, h: int) -> np.ndarray:
+        return self._rasterize(h, lambda draw: draw.rounded_rectangle([0, 0, self.hole_w, h], radius=self.radius, fill=1))
+
+    def draw_rounded_rect(self, band: np.ndarray, x: int, y: int, h: int) -> None:
+        """Same as ImageDraw.rounded_rectangle([x, y, x + hole_w, y + h]) on the bool band"""
+        cap_h = len(self.top_cap)
+        if h > 2 * cap_h:
+            stamp(band, self.top_cap, x, y)
+            band[max(y + cap_h, 0):max(y + h + 1 - cap_h, 0), max(x, 0):max(x + self.hole_w + 1, 0)] = True
+            stamp(band, self.bottom_cap, x, y + h + 1 - cap_h)
+            return
+
+        if h not in self.rects:
+            if h < 0:
+                raise ValueError("y1 must be greater than or equal to y0")
+            self.rects[h] = self._rounded_rect(h)
+        stamp(band, self.rects[h], x, y)
+
+    def chain_run(self, num: int) -> np.ndarray:
+        """Sprite of num chain perforation dots, chain_step apart"""
+        if num not in self.chain_runs:
+            dot_h = len(self.dot)
+            run = np.zeros((max(num * self.chain_step, (num - 1) * self.chain_step + dot_h), self.hole_w + 1), dtype=bool)
+            if self.chain_step >= dot_h:
+                # every dot in its own row block. one strided assignment for all dots
+                run[:num * self.chain_step].reshape(num, self.chain_step, -1)[:, :dot_h] = self.dot
+            else:
+                for i in range(num):
+                    run[i * self.chain_step:i * self.chain_step + dot_h] |= self.dot
+            self.chain_runs[num] = run[:(num - 1) * self.chain_step + dot_h]
+        return self.chain_runs[num]
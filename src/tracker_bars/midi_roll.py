@@ -0,0 +1,92 @@
+import heapq
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .smf_reader import UnsupportedSmfError, read_smf
+
+if TYPE_CHECKING:
+    import mido
+
+# MIDI status of the events kept in MidiRoll
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+CONTROL_CHANGE = 0xB0
+
+
+@dataclass
+class MidiRoll:
+    """DPI and tempo independent contents of a MIDI file.
+
+    Built once per MIDI file and can be rendered many times with different tracker configs.
+    Events of all tracks are merged in time order.
+    """
+    ppq: int
+    total_ticks: int
+    tempo_ticks: np.ndarray  # absolute tick of each tempo event
+    tempos: np.ndarray  # tempo in us per beat
+    ticks: np.ndarray  # absolute tick of each event
+    status: np.ndarray  # NOTE_OFF, NOTE_ON or CONTROL_CHANGE
+    channel: np.ndarray
+    data1: np.ndarray  # note number or control number
+    data2: np.ndarray  # velocity or control value
+    load_sec: float = 0.0  # time to read the file
+
+    @property
+    def event_num(self) -> int:
+        return len(self.ticks)
+
+
+def _iter_abs_tick(track: "mido.MidiTrack") -> Iterator[tuple[int, "mido.Message"]]:
+    abs_tick = 0
+    for msg in track:
+        abs_tick += msg.time
+        yield abs_tick, msg
+
+
+def load_midi(midi_path: str, fast_reader: bool = True) -> MidiRoll:
+    """Read MIDI file. The built-in fast reader is used when possible, otherwise mido."""
+    t1 = time.perf_counter()
+    roll = None
+    if fast_reader:
+        try:
+            roll = MidiRoll(*read_smf(midi_path))
+        except UnsupportedSmfError as e:
+            print(f"Read by mido: {e}")
+
+    if roll is None:
+        roll = _load_midi_mido(midi_path)
+    roll.load_sec = time.perf_counter() - t1
+    return roll
+
+
+def _load_midi_mido(midi_path: str) -> MidiRoll:
+    import mido  # only needed for files the fast reader does not handle
+
+    mid = mido.MidiFile(midi_path)
+
+    # all tracks are merged lazily into one time-ordered stream, and read in a single pass.
+    # on the same tick, events of former tracks come first.
+    total_ticks = 0
+    events: list[tuple[int, int, int, int, int]] = []
+    tempo_events: list[tuple[int, int]] = []
+    for abs_tick, msg in heapq.merge(*(_iter_abs_tick(track) for track in mid.tracks), key=lambda v: v[0]):
+        total_ticks = abs_tick
+
+        if msg.type == "set_tempo":
+            tempo_events.append((abs_tick, msg.tempo))
+        elif msg.type == "note_on":
+            events.append((abs_tick, NOTE_ON, msg.channel, msg.note, msg.velocity))
+        elif msg.type == "note_off":
+            events.append((abs_tick, NOTE_OFF, msg.channel, msg.note, msg.velocity))
+        elif msg.type == "control_change":
+            events.append((abs_tick, CONTROL_CHANGE, msg.channel, msg.control, msg.value))
+
+    tempo_arr = np.array(tempo_events, dtype=np.int64).reshape(-1, 2)
+
+    arr = np.array(events, dtype=np.int64).reshape(-1, 5)
+    return MidiRoll(mid.ticks_per_beat, total_ticks, tempo_arr[:, 0].copy(), tempo_arr[:, 1].copy(),
+                    arr[:, 0].copy(), arr[:, 1].astype(np.uint8), arr[:, 2].astype(np.uint8), arr[:, 3].astype(np.uint8), arr[:, 4].astype(np.uint8))
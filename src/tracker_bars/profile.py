@@ -0,0 +1,66 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import NamedTuple
+
+import numpy as np
+
+PROFILE_CACHE_SIZE = 32  # the GUI makes a new profile on every setting edit, so old ones are dropped
+HOLE_INDEX_NUM = 512  # mapped note numbers are below this
+
+
+class TrackerProfile(NamedTuple):
+    """Tracker config compiled into dense lookup tables. Holes are indexed by the mapped note number."""
+    note_hole: np.ndarray  # (16, 128). channel x note number -> hole index
+    control_hole: np.ndarray  # (128,). control change number -> hole index, -1 if not mapped
+    hole_x: np.ndarray  # hole index -> left edge in px
+    top_offset: np.ndarray  # (HOLE_INDEX_NUM,). hole index -> offset of the top edge in px
+    bottom_offset: np.ndarray  # (HOLE_INDEX_NUM,). hole index -> offset of the bottom edge in px
+
+
+def config_hash(tracker_config: dict) -> str:
+    return hashlib.sha1(json.dumps(tracker_config, sort_keys=True).encode()).hexdigest()
+
+
+def compile_profile(control_change_map: dict[int, int], custom_note_map: dict[int, dict[int, int]],
+                    custom_hole_offsets: dict[int, dict[str, float]], hole_x_list: list[int]) -> TrackerProfile:
+    note_hole = np.tile(np.arange(128, dtype=np.int64), (16, 1))
+    for channel, note_map in custom_note_map.items():
+        for note_no, hole in note_map.items():
+            if 0 <= channel < 16 and 0 <= note_no < 128:  # others never match a MIDI event
+                note_hole[channel, note_no] = hole
+
+    control_hole = np.full(128, -1, dtype=np.int64)
+    control_hole[list(control_change_map.keys())] = list(control_change_map.values())
+
+    # hole_x_list starts at note number 15. Note numbers below 15 take the list from the end, as negative indices did
+    hole_x = np.asarray(hole_x_list, dtype=np.int64)[np.arange(-15, len(hole_x_list))]
+
+    top_offset = np.zeros(HOLE_INDEX_NUM)
+    bottom_offset = np.zeros(HOLE_INDEX_NUM)
+    for no, offset in custom_hole_offsets.items():
+        top_offset[no] = offset["top_offset"]
+        bottom_offset[no] = offset["bottom_offset"]
+
+    return TrackerProfile(note_hole, control_hole, hole_x, top_offset, bottom_offset)
+
+
+_profiles: OrderedDict[tuple, TrackerProfile] = OrderedDict()
+_profiles_lock = threading.Lock()  # preview and save threads make converters at the same time
+
+
+def get_profile(key: tuple, build: Callable[[], TrackerProfile]) -> TrackerProfile:
+    """Cached profile of the key, built by build() on a miss. Least recently used ones are dropped."""
+    with _profiles_lock:
+        if key in _profiles:
+            _profiles.move_to_end(key)
+            return _profiles[key]
+
+    profile = build()
+    with _profiles_lock:
+        _profiles[key] = profile
+        while len(_profiles) > PROFILE_CACHE_SIZE:
+            _profiles.popitem(last=False)
+    return profile
@@ -0,0 +1,128 @@
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# number of data bytes of channel messages, by the upper nibble of status
+_DATA_LEN = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+_KEEP_STATUS = (0x80, 0x90, 0xB0)  # note_off, note_on, control_change
+
+
+class UnsupportedSmfError(Exception):
+    """The file has something the fast reader does not handle. It should be read by mido instead."""
+
+
+def _read_track(buf: mmap.mmap, pos: int, end: int, events: list, tempo_events: list) -> int:
+    """Read events of one MTrk chunk body. Returns the absolute tick at the end of the track."""
+    abs_tick = 0
+    last_status = 0
+    append = events.append
+    while pos < end:
+        # delta time
+        delta = 0
+        while True:
+            byte = buf[pos]
+            pos += 1
+            delta = (delta << 7) | (byte & 0x7F)
+            if byte < 0x80:
+                break
+        abs_tick += delta
+
+        status = buf[pos]
+        if status < 0x80:  # running status
+            if last_status == 0:
+                raise UnsupportedSmfError("running status without last status")
+            status = last_status
+        else:
+            pos += 1
+            if status != 0xFF:  # meta events don't set running status
+                last_status = status
+
+        if status == 0xFF:  # meta event
+            meta_type = buf[pos]
+            pos += 1
+            length = 0
+            while True:
+                byte = buf[pos]
+                pos += 1
+                length = (length << 7) | (byte & 0x7F)
+                if byte < 0x80:
+                    break
+            if meta_type == 0x51:  # set_tempo
+                if length < 3:
+                    raise UnsupportedSmfError("broken set_tempo event")
+                tempo_events.append((abs_tick, (buf[pos] << 16) | (buf[pos + 1] << 8) | buf[pos + 2]))
+            pos += length
+        elif status < 0xF0:  # channel message
+            kind = status & 0xF0
+            if _DATA_LEN[kind] == 2:
+                data1 = buf[pos]
+                data2 = buf[pos + 1]
+                pos += 2
+                if data1 > 0x7F or data2 > 0x7F:
+                    raise UnsupportedSmfError("data byte out of range")
+                if kind in _KEEP_STATUS:
+                    append((abs_tick, kind, status & 0x0F, data1, data2))
+            else:
+                if buf[pos] > 0x7F:
+                    raise UnsupportedSmfError("data byte out of range")
+                pos += 1
+        else:
+            # sysex, system common and real time messages are rare in roll MIDI
+            raise UnsupportedSmfError(f"status byte 0x{status:02x}")
+
+    if pos != end:
+        raise UnsupportedSmfError("event runs over the end of the track")
+    return abs_tick
+
+
+def read_smf(midi_path: str) -> tuple[int, int, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Decode Standard MIDI File into typed arrays without building mido messages.
+
+    Only note_on, note_off, control_change and set_tempo are kept.
+    Returns the fields of MidiRoll: ppq, total_ticks, tempo_ticks, tempos, ticks, status, channel, data1, data2
+    Raises UnsupportedSmfError for anything unusual.
+    """
+    with open(midi_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise UnsupportedSmfError("empty file")
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with buf:
+        try:
+            name, size = struct.unpack_from(">4sL", buf, 0)
+            if name != b"MThd" or size < 6:
+                raise UnsupportedSmfError("MThd not found")
+            _, track_num, ppq = struct.unpack_from(">hhh", buf, 8)
+            if ppq <= 0:
+                raise UnsupportedSmfError("SMPTE time division")
+
+            # each track is decoded into its own list, then merged in time order.
+            # a stable sort keeps former tracks first on the same tick.
+            pos = 8 + size
+            total_ticks = 0
+            events: list[tuple[int, int, int, int, int]] = []
+            tempo_events: list[tuple[int, int]] = []
+            track_events: list[np.ndarray] = []
+            track_tempos: list[np.ndarray] = []
+            for _ in range(track_num):
+                name, size = struct.unpack_from(">4sL", buf, pos)
+                if name != b"MTrk" or pos + 8 + size > len(buf):
+                    raise UnsupportedSmfError("broken MTrk chunk")
+                events.clear()
+                tempo_events.clear()
+                total_ticks = max(_read_track(buf, pos + 8, pos + 8 + size, events, tempo_events), total_ticks)
+                track_events.append(np.array(events, dtype=np.int64).reshape(-1, 5))
+                track_tempos.append(np.array(tempo_events, dtype=np.int64).reshape(-1, 2))
+                pos += 8 + size
+        except (struct.error, IndexError) as e:
+            raise UnsupportedSmfError("truncated file") from e
+
+    arr = np.concatenate(track_events) if track_events else np.zeros((0, 5), dtype=np.int64)
+    arr = arr[np.argsort(arr[:, 0], kind="stable")]
+    tempo_arr = np.concatenate(track_tempos) if track_tempos else np.zeros((0, 2), dtype=np.int64)
+    tempo_arr = tempo_arr[np.argsort(tempo_arr[:, 0], kind="stable")]
+
+    return (ppq, total_ticks, tempo_arr[:, 0].copy(), tempo_arr[:, 1].copy(),
+            arr[:, 0].copy(), arr[:, 1].astype(np.uint8), arr[:, 2].astype(np.uint8), arr[:, 3].astype(np.uint8), arr[:, 4].astype(np.uint8))
@@ -0,0 +1,34 @@
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class ConvertStats:
+    """Wall time of each stage and counters of one conversion"""
+    load_sec: float = 0.0  # MIDI file reading
+    pairing_sec: float = 0.0  # note on/off pairing
+    layout_sec: float = 0.0  # hole coordinates
+    raster_sec: float = 0.0  # drawing holes
+    encode_sec: float = 0.0  # image encoding and writing
+    events: int = 0  # note and control change events
+    holes: int = 0
+    chain_perforations: int = 0  # chain perforation dots
+    canvas_pixels: int = 0
+
+    @property
+    def total_sec(self) -> float:
+        return self.load_sec + self.pairing_sec + self.layout_sec + self.raster_sec + self.encode_sec
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Add the elapsed time of the with-block to the stage, e.g. with stats.measure("raster_sec"):"""
+        t1 = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self, stage, getattr(self, stage) + time.perf_counter() - t1)
+
+    def to_dict(self) -> dict:
+        return asdict(self) | {"total_sec": self.total_sec}
@@ -0,0 +1,47 @@
+import numpy as np
+
+DEFAULT_MIDI_TEMPO = 500_000  # us per beat (120 BPM). Used until the first tempo event
+
+
+class TempoMap:
+    """Converts MIDI ticks to roll pixels, following the tempo changes of MIDI file.
+
+    The MIDI is split into segments of constant tempo. Start pixel of each segment is precomputed,
+    so a conversion is a binary search plus a multiply, and works on whole arrays of ticks.
+    """
+    def __init__(self, tempo_ticks: np.ndarray, tempos: np.ndarray, ppq: int, dpi: int, roll_tempo: int) -> None:
+        self.ppq = ppq
+        self.dpi = dpi
+        self.roll_tempo = roll_tempo
+
+        # tempo_ticks must be sorted. if several tempo events are on the same tick, the last one wins
+        seg_ticks = np.asarray(tempo_ticks, dtype=np.int64)
+        seg_tempos = np.asarray(tempos, dtype=np.float64)
+        if len(seg_ticks) == 0 or seg_ticks[0] > 0:
+            seg_ticks = np.concatenate(([0], seg_ticks))
+            seg_tempos = np.concatenate(([DEFAULT_MIDI_TEMPO], seg_tempos))
+        last_of_tick = np.append(seg_ticks[1:] != seg_ticks[:-1], True)
+        self.seg_ticks = seg_ticks[last_of_tick]
+        self.seg_bpm = 60_000_000.0 / seg_tempos[last_of_tick]
+
+        # pixel position where each segment starts
+        seg_len_px = self._len_to_px(np.diff(self.seg_ticks), self.seg_bpm[:-1])
+        self.seg_px = np.concatenate(([0.0], np.cumsum(seg_len_px)))
+
+    def _len_to_px(self, tick_len, bpm):
+        return ((tick_len * self.dpi * self.roll_tempo * 1.2) / (bpm * self.ppq))
+
+    def _segment(self, ticks) -> np.ndarray:
+        return np.maximum(np.searchsorted(self.seg_ticks, ticks, side="right") - 1, 0)
+
+    def tick_to_px(self, ticks):
+        """Pixel position of ticks. Accepts a scalar or an array"""
+        seg = self._segment(ticks)
+        return self.seg_px[seg] + self._len_to_px(ticks - self.seg_ticks[seg], self.seg_bpm[seg])
+
+    def interval_to_px(self, on_ticks: np.ndarray, off_ticks: np.ndarray) -> np.ndarray:
+        """Pixel length of intervals between on_ticks and off_ticks"""
+        on_seg = self._segment(on_ticks)
+        off_seg = self._segment(off_ticks)
+        same_seg_len = self._len_to_px(off_ticks - on_ticks, self.seg_bpm[on_seg])
+        return np.where(on_seg == off_seg, same_seg_len, self.tick_to_px(off_ticks) - self.tick_to_px(on_ticks))
@@ -1,9 +1,9 @@
 import webbrowser
 
 import customtkinter as ctk
-from PIL import Image
 
-from const import APP_TITLE, APP_VERSION, ASSETS_DIR, COPY_RIGHT, LINK_COLOR
+from const import APP_TITLE, APP_VERSION, COPY_RIGHT, LINK_COLOR
+from icons import ctk_icon, load_image
 
 
 class WelcomMessage:
@@ -12,8 +12,7 @@ class WelcomMessage:
         self.frame.grid(row=0, column=1, sticky="nsew")
 
         # drag & drop text
-        image = ctk.CTkImage(light_image=Image.open(f"{ASSETS_DIR}/folder_open_256dp_000000_FILL0_wght400_GRAD0_opsz48.png"),
-                             dark_image=Image.open(f"{ASSETS_DIR}/folder_open_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png"), size=(40, 40))
+        image = ctk_icon("folder_open_256dp_000000_FILL0_wght400_GRAD0_opsz48.png", "folder_open_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png", size=(40, 40))
         ctk.CTkLabel(self.frame, image=image, compound="left", padx=15, text="Open or Drag MIDI FILE here!", font=ctk.CTkFont(size=40, weight="bold")).pack(pady=(80, 50))
 
         # donation link
@@ -31,21 +30,27 @@ class WelcomMessage:
         project_link.pack()
         ctk.CTkLabel(self.frame, text=f"Version {APP_VERSION}\n{COPY_RIGHT}").pack()
 
-        image = ctk.CTkImage(light_image=Image.open(f"{ASSETS_DIR}/tooltip_2_256dp_000000_FILL0_wght400_GRAD0_opsz48.png"),
-                             dark_image=Image.open(f"{ASSETS_DIR}/tooltip_2_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png"), size=(40, 40))
+        # tips are below the first view. Their large images are decoded after the first frame is shown
+        self.frame.after_idle(self.create_tips)
+
+    def create_tips(self):
+        if not self.frame.winfo_exists():  # already replaced by the roll viewer
+            return
+
+        image = ctk_icon("tooltip_2_256dp_000000_FILL0_wght400_GRAD0_opsz48.png", "tooltip_2_256dp_FFFFFF_FILL0_wght400_GRAD0_opsz48.png", size=(40, 40))
         ctk.CTkLabel(self.frame, image=image, compound="left", padx=15, text="Tips", font=ctk.CTkFont(size=40, weight="bold")).pack(pady=20, anchor="w")
 
-        image = Image.open(f"{ASSETS_DIR}/hole_param1.png")
+        image = load_image("hole_param1.png")
         image = ctk.CTkImage(image, size=(image.size[0] // 2, image.size[1] // 2))
         ctk.CTkLabel(self.frame, text="", image=image).pack(padx=20, anchor="e", side="right")
 
-        ctk.CTkLabel(self.frame, text="- Currently, tempo change event during music is not supported.").pack(padx=20, pady=5, anchor="w")
+        ctk.CTkLabel(self.frame, text="- Tempo change events during music are followed. 120 BPM is used until the first tempo event.").pack(padx=20, pady=5, anchor="w")
         ctk.CTkLabel(self.frame, text="- The default roll acceleration is 0.18% per feet, based on Stanford Univ paper.").pack(padx=20, pady=5, anchor="w")
         ctk.CTkLabel(self.frame, text="- Sustain/soft pedal control change events are mapped to Hole #4 and #98 of 100 holes.").pack(padx=20, pady=5, anchor="w")
         ctk.CTkLabel(self.frame, text="- Shorten hole length adjusts the note length shorter. MIDI are often longer than the actual hole.").pack(padx=20, pady=5, anchor="w")
         ctk.CTkLabel(self.frame, text="- Image is saved as .PNG for efficient file size.").pack(padx=20, pady=5, anchor="w")
         ctk.CTkLabel(self.frame, text="- The hole positions refer to these positions.").pack(padx=20, pady=5, anchor="w")
 
-        image = Image.open(f"{ASSETS_DIR}/hole_param2.png")
+        image = load_image("hole_param2.png")
         image = ctk.CTkImage(image, size=(image.size[0] // 1.5, image.size[1] // 1.5))
         ctk.CTkLabel(self.frame, text="", image=image).pack(padx=20, pady=15)